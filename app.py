@@ -6,8 +6,11 @@ Main Flask application serving as the entry point
 import os
 import sys
 import json
+import queue
+import atexit
 import logging
 import asyncio
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime, timedelta
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session, flash
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
@@ -18,14 +21,21 @@ from dotenv import load_dotenv
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-# Configure logging
+# Configure logging; records are written by a listener thread so file and
+# console I/O doesn't block request threads or their event loops
+_log_queue = queue.SimpleQueue()
+_log_listener = QueueListener(
+    _log_queue,
+    logging.FileHandler("app.log"),
+    logging.StreamHandler()
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
+    handlers=[QueueHandler(_log_queue)]
 )
 logger = logging.getLogger(__name__)
 
@@ -625,8 +635,8 @@ def analyze_dependencies():
         
         return jsonify({
             'success': True,
-            'analysis': analysis,
-            'parallel_suggestion': parallel_suggestion
+            'analysis': analysis.to_dict(),
+            'parallel_suggestion': parallel_suggestion.to_dict()
         })
         
     except Exception as e:
@@ -845,18 +855,16 @@ def get_model_rankings(role):
                 'error': f'Invalid role: {role}'
             })
         
-        # Load config from file
-        config_path = os.path.join('config', 'server_config.json')
+        # Load config, parsed once and re-read only when the file changes
+        from model_providers import get_server_config
+        config = get_server_config()
         
-        if not os.path.exists(config_path):
+        if config is None:
             return jsonify({
                 'success': False,
                 'error': 'Server configuration file not found'
             })
         
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
         # Get rankings for the specified role
         rankings = config.get('model_rankings', {}).get(role, [])
         
@@ -936,18 +944,16 @@ def update_model_rankings(role):
 def get_task_mappings():
     """Get task-model mappings"""
     try:
-        # Load config from file
-        config_path = os.path.join('config', 'server_config.json')
+        # Load config, parsed once and re-read only when the file changes
+        from model_providers import get_server_config
+        config = get_server_config()
         
-        if not os.path.exists(config_path):
+        if config is None:
             return jsonify({
                 'success': False,
                 'error': 'Server configuration file not found'
             })
         
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
         # Get task mappings
         mappings = config.get('task_model_matching', {})
         
@@ -1017,18 +1023,16 @@ def update_task_mappings():
 def get_settings():
     """Get local model settings"""
     try:
-        # Load config from file
-        config_path = os.path.join('config', 'server_config.json')
+        # Load config, parsed once and re-read only when the file changes
+        from model_providers import get_server_config
+        config = get_server_config()
         
-        if not os.path.exists(config_path):
+        if config is None:
             return jsonify({
                 'success': False,
                 'error': 'Server configuration file not found'
             })
         
-        with open(config_path, 'r') as f:
-            config = json.load(f)
-        
         # Get settings
         settings = config.get('settings', {})
         
@@ -4,11 +4,273 @@ Module for managing dependencies between script components
 """
 
 import os
+import sys
 import json
+import heapq
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass
 import networkx as nx
 from typing import Dict, List, Any, Optional, Tuple, Set, Union
 from pathlib import Path
 
+# Setup logging
+logger = logging.getLogger(__name__)
+
+
+# Graphs with more nodes than this use the Numba kernel for generation order
+_NUMBA_NODE_THRESHOLD = 1000
+
+_kahn_kernel = None
+
+
+def _get_kahn_kernel():
+    """
+    Compile the Kahn topological sort kernel on first use
+    
+    Numba is imported lazily so small graphs never pay for it.
+    
+    Returns:
+        Compiled kernel function, or None if Numba is not installed
+    """
+    global _kahn_kernel
+    
+    if _kahn_kernel is None:
+        try:
+            import numpy as np
+            from numba import njit
+        except ImportError:
+            logger.debug("Numba not installed, using NetworkX for generation order")
+            _kahn_kernel = False
+            return None
+        
+        @njit(cache=True)
+        def kahn_csr(indptr, indices, in_degree):
+            """Kahn's algorithm over a CSR successor list, returning (order, levels, count)"""
+            n = in_degree.shape[0]
+            remaining = in_degree.copy()
+            order = np.empty(n, dtype=np.int32)
+            levels = np.zeros(n, dtype=np.int32)
+            
+            # The order array doubles as the FIFO queue of ready nodes
+            tail = 0
+            for v in range(n):
+                if remaining[v] == 0:
+                    order[tail] = v
+                    tail += 1
+            
+            head = 0
+            while head < tail:
+                u = order[head]
+                head += 1
+                for k in range(indptr[u], indptr[u + 1]):
+                    v = indices[k]
+                    if levels[u] + 1 > levels[v]:
+                        levels[v] = levels[u] + 1
+                    remaining[v] -= 1
+                    if remaining[v] == 0:
+                        order[tail] = v
+                        tail += 1
+            
+            return order[:tail], levels, tail
+        
+        _kahn_kernel = kahn_csr
+    
+    return _kahn_kernel or None
+
+
+def _iter_back_edge_cycles(graph: Dict[str, Any], max_cycles: int = 10):
+    """
+    Yield cycles found through back edges of an iterative depth-first search
+    
+    Each back edge closes exactly one cycle on the current DFS path, so this
+    runs in O(V+E) and reports at most one cycle per back edge. It does not
+    enumerate every simple cycle, which can be exponential in number.
+    
+    Args:
+        graph: Mapping from each node to an iterable of its successors
+        max_cycles: Stop after this many cycles
+        
+    Yields:
+        Lists of nodes forming a cycle, without repeating the first node
+    """
+    if max_cycles <= 0:
+        return
+    
+    # 0 = unvisited, 1 = on the current path, 2 = finished
+    color = dict.fromkeys(graph, 0)
+    found = 0
+    
+    for root in graph:
+        if color[root]:
+            continue
+        
+        color[root] = 1
+        path = [root]
+        stack_idx = {root: 0}
+        stack = [(root, iter(graph[root]))]
+        
+        while stack:
+            node, successors = stack[-1]
+            for succ in successors:
+                state = color[succ]
+                if state == 0:
+                    color[succ] = 1
+                    stack_idx[succ] = len(path)
+                    path.append(succ)
+                    stack.append((succ, iter(graph[succ])))
+                    break
+                if state == 1:
+                    yield path[stack_idx[succ]:]
+                    found += 1
+                    if found >= max_cycles:
+                        return
+            else:
+                stack.pop()
+                path.pop()
+                del stack_idx[node]
+                color[node] = 2
+
+
+def _intern(value: Any) -> Any:
+    """
+    Intern a value if it is a string, leaving other values untouched
+    
+    Args:
+        value: Value to intern
+        
+    Returns:
+        Interned string, or the original value
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class _UnionFind:
+    """
+    Disjoint-set forest with path compression and union by rank
+    """
+    
+    def __init__(self, nodes):
+        """
+        Initialize the union-find structure
+        
+        Args:
+            nodes: Iterable of nodes, each starting in its own set
+        """
+        self.parent = {node: node for node in nodes}
+        self.rank = dict.fromkeys(self.parent, 0)
+    
+    def find(self, node):
+        """
+        Find the representative of the set containing a node
+        
+        Args:
+            node: Node to look up
+            
+        Returns:
+            Representative node of the set
+        """
+        root = node
+        while self.parent[root] != root:
+            root = self.parent[root]
+        
+        # Compress the path so later lookups are direct
+        while self.parent[node] != root:
+            self.parent[node], node = root, self.parent[node]
+        
+        return root
+    
+    def union(self, a, b) -> None:
+        """
+        Merge the sets containing two nodes
+        
+        Args:
+            a: First node
+            b: Second node
+        """
+        root_a = self.find(a)
+        root_b = self.find(b)
+        if root_a == root_b:
+            return
+        
+        if self.rank[root_a] < self.rank[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        if self.rank[root_a] == self.rank[root_b]:
+            self.rank[root_a] += 1
+
+
+@dataclass
+class DependencyAnalysis:
+    """Result of analyzing dependencies between components"""
+    __slots__ = ("dependency_graph", "generation_order", "critical_path", "has_cycles",
+                 "cycles", "strongly_connected_components", "complexity")
+    
+    dependency_graph: Dict[str, List[str]]
+    generation_order: List[str]
+    critical_path: List[str]
+    has_cycles: bool
+    cycles: List[List[str]]
+    strongly_connected_components: List[List[str]]
+    complexity: Dict[str, Any]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert analysis to dictionary for serialization"""
+        return {
+            "dependency_graph": self.dependency_graph,
+            "generation_order": self.generation_order,
+            "critical_path": self.critical_path,
+            "has_cycles": self.has_cycles,
+            "cycles": self.cycles,
+            "strongly_connected_components": self.strongly_connected_components,
+            "complexity": self.complexity
+        }
+
+
+@dataclass
+class ValidationResult:
+    """Result of validating dependencies between components"""
+    __slots__ = ("valid", "has_cycles", "cycles", "missing_dependencies",
+                 "islands", "connected_components")
+    
+    valid: bool
+    has_cycles: bool
+    cycles: List[List[str]]
+    missing_dependencies: List[Dict[str, str]]
+    islands: List[str]
+    connected_components: List[List[str]]
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert validation result to dictionary for serialization"""
+        return {
+            "valid": self.valid,
+            "has_cycles": self.has_cycles,
+            "cycles": self.cycles,
+            "missing_dependencies": self.missing_dependencies,
+            "islands": self.islands,
+            "connected_components": self.connected_components
+        }
+
+
+@dataclass
+class ParallelPlan:
+    """Suggested grouping of components for parallel execution"""
+    __slots__ = ("parallel_groups", "max_parallel_workers", "generation_order", "level_count")
+    
+    parallel_groups: List[List[Dict[str, Any]]]
+    max_parallel_workers: int
+    generation_order: List[str]
+    level_count: int
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert parallel plan to dictionary for serialization"""
+        return {
+            "parallel_groups": self.parallel_groups,
+            "max_parallel_workers": self.max_parallel_workers,
+            "generation_order": self.generation_order,
+            "level_count": self.level_count
+        }
+
 
 class DependencyManager:
     """
@@ -23,8 +285,9 @@ class DependencyManager:
             config: Configuration dictionary with dependency management settings
         """
         self.config = config or {}
+        self._cache = None
         
-    def analyze_dependencies(self, components: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_dependencies(self, components: List[Dict[str, Any]]) -> DependencyAnalysis:
         """
         Analyze dependencies between components and create a dependency graph
         
@@ -32,13 +295,10 @@ class DependencyManager:
             components: List of component definitions
             
         Returns:
-            Dictionary containing dependency analysis results
+            DependencyAnalysis containing dependency analysis results
         """
-        # Create dependency graph
-        dependency_graph = self._create_dependency_graph(components)
-        
-        # Create NetworkX graph for advanced analysis
-        G = self._create_networkx_graph(dependency_graph)
+        # Create dependency graph and NetworkX graph for advanced analysis
+        _, dependency_graph, G = self._cached_graph(components)
         
         # Determine generation order
         generation_order = self._determine_generation_order(G)
@@ -46,58 +306,101 @@ class DependencyManager:
         # Identify critical path
         critical_path = self._identify_critical_path(G, generation_order)
         
-        # Check for cycles
-        cycles = list(nx.simple_cycles(G))
+        # Check for cycles; cycle enumeration and SCC search are only
+        # needed when the linear-time DAG check fails
+        has_cycles = not nx.is_directed_acyclic_graph(G)
         
-        # Identify strongly connected components
-        strongly_connected = list(nx.strongly_connected_components(G))
+        if has_cycles:
+            cycles = list(_iter_back_edge_cycles(G.adj, self.config.get("max_cycles", 10)))
+            strongly_connected = [list(component) for component in nx.strongly_connected_components(G)]
+        else:
+            # Every strongly connected component of a DAG is a single node
+            cycles = []
+            strongly_connected = [[node] for node in G.nodes()]
+        
+        return DependencyAnalysis(
+            # Copied, since the cached graph is reused by later calls
+            dependency_graph={node: list(dependencies) for node, dependencies in dependency_graph.items()},
+            generation_order=generation_order,
+            critical_path=critical_path,
+            has_cycles=has_cycles,
+            cycles=cycles,
+            strongly_connected_components=strongly_connected,
+            complexity=self._calculate_dependency_complexity(G, dependency_graph, critical_path)
+        )
+    
+    def _cached_graph(self, components: List[Dict[str, Any]]) -> Tuple[Tuple[List[Any], List[Any], List[List[str]]], Dict[str, List[str]], nx.DiGraph]:
+        """
+        Get the component columns, dependency graph and NetworkX graph for a
+        list of components, reusing the last result when called again with
+        the same components
         
-        return {
-            "dependency_graph": dependency_graph,
-            "generation_order": generation_order,
-            "critical_path": critical_path,
-            "has_cycles": len(cycles) > 0,
-            "cycles": cycles,
-            "strongly_connected_components": [list(component) for component in strongly_connected],
-            "complexity": self._calculate_dependency_complexity(G)
-        }
+        Args:
+            components: List of component definitions
+            
+        Returns:
+            Tuple of ((ids, names, dependency lists), dependency_graph, NetworkX DiGraph)
+        """
+        columns = self._component_columns(components)
+        ids, names, deps_lists = columns
+        # The key itself is compared, not its hash, so colliding component
+        # lists can't share a graph
+        components_key = tuple(zip(ids, names, map(tuple, deps_lists)))
+        
+        if self._cache is None or self._cache[0] != components_key:
+            dependency_graph = self._create_dependency_graph(components, columns)
+            G = self._create_networkx_graph(dependency_graph)
+            self._cache = (components_key, columns, dependency_graph, G)
+        
+        return self._cache[1], self._cache[2], self._cache[3]
+    
+    def _component_columns(self, components: List[Dict[str, Any]]) -> Tuple[List[Any], List[Any], List[List[str]]]:
+        """
+        Transpose component definitions into parallel lists of the fields
+        used for dependency analysis
+        
+        Args:
+            components: List of component definitions
+            
+        Returns:
+            Tuple of (ids, names, dependency lists), aligned by component index
+        """
+        # Intern string keys so the many dict and set lookups downstream
+        # can short-circuit on identity
+        ids = [_intern(c.get("id")) for c in components]
+        names = [_intern(c.get("name")) for c in components]
+        deps_lists = [[_intern(dep) for dep in c.get("depends_on") or []] for c in components]
+        return ids, names, deps_lists
     
-    def _create_dependency_graph(self, components: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    def _create_dependency_graph(self,
+                                 components: List[Dict[str, Any]],
+                                 columns: Optional[Tuple[List[Any], List[Any], List[List[str]]]] = None) -> Dict[str, List[str]]:
         """
         Create a dependency graph from component definitions
         
         Args:
             components: List of component definitions
+            columns: Precomputed result of _component_columns (optional)
             
         Returns:
             Dictionary mapping component IDs to their dependencies
         """
-        graph = {}
+        ids, names, deps_lists = columns or self._component_columns(components)
+        graph = {component_id: [] for component_id in ids}
         
-        # Create mapping from component name to ID
-        name_to_id = {}
-        for component in components:
-            component_id = component.get("id")
-            component_name = component.get("name")
-            if component_name:
-                name_to_id[component_name] = component_id
-            graph[component_id] = []
+        # Map both names and IDs to IDs so each dependency resolves with a
+        # single lookup; IDs are added last so they win over a matching name
+        resolve = {name: component_id for component_id, name in zip(ids, names) if name}
+        resolve.update((component_id, component_id) for component_id in ids)
         
         # Add dependencies
-        for component in components:
-            component_id = component.get("id")
-            dependencies = component.get("depends_on", [])
+        for component_id, dependencies in zip(ids, deps_lists):
+            edges = graph[component_id]
             
             for dependency in dependencies:
-                # Check if dependency is already an ID
-                if dependency in graph:
-                    dep_id = dependency
-                else:
-                    # Look up ID by name
-                    dep_id = name_to_id.get(dependency)
-                
+                dep_id = resolve.get(dependency)
                 if dep_id and dep_id != component_id:  # Avoid self-dependencies
-                    graph[component_id].append(dep_id)
+                    edges.append(dep_id)
         
         return graph
     
@@ -113,14 +416,13 @@ class DependencyManager:
         """
         G = nx.DiGraph()
         
-        # Add all nodes
-        for node in dependency_graph:
-            G.add_node(node)
-        
-        # Add all edges
-        for node, dependencies in dependency_graph.items():
-            for dep in dependencies:
-                G.add_edge(dep, node)  # Edge from dependency to dependent
+        # Add all nodes and edges in bulk rather than one call per item
+        G.add_nodes_from(dependency_graph)
+        G.add_edges_from(
+            (dep, node)  # Edge from dependency to dependent
+            for node, dependencies in dependency_graph.items()
+            for dep in dependencies
+        )
         
         return G
     
@@ -134,6 +436,12 @@ class DependencyManager:
         Returns:
             List of component IDs in generation order
         """
+        # Large graphs go through the compiled Kahn kernel when Numba is installed
+        if G.number_of_nodes() > self.config.get("numba_node_threshold", _NUMBA_NODE_THRESHOLD):
+            order = self._compiled_generation_order(G)
+            if order is not None:
+                return order
+        
         try:
             # Use topological sort for acyclic graphs
             return list(nx.topological_sort(G))
@@ -141,6 +449,46 @@ class DependencyManager:
             # Graph has cycles, use approximate approach
             return self._approximate_generation_order(G)
     
+    def _compiled_generation_order(self, G: nx.DiGraph) -> Optional[List[str]]:
+        """
+        Determine the generation order with the Numba Kahn kernel
+        
+        Args:
+            G: NetworkX DiGraph representing the dependency graph
+            
+        Returns:
+            List of component IDs in generation order, or None if Numba is
+            unavailable or the graph has cycles
+        """
+        kernel = _get_kahn_kernel()
+        if kernel is None:
+            return None
+        
+        import numpy as np
+        
+        # Map component IDs to dense indices and build a CSR successor list
+        nodes = list(G.nodes())
+        index = {node: i for i, node in enumerate(nodes)}
+        indptr = np.zeros(len(nodes) + 1, dtype=np.int32)
+        indices = np.empty(G.number_of_edges(), dtype=np.int32)
+        in_degree = np.zeros(len(nodes), dtype=np.int32)
+        
+        pos = 0
+        for i, node in enumerate(nodes):
+            for succ in G.successors(node):
+                j = index[succ]
+                indices[pos] = j
+                in_degree[j] += 1
+                pos += 1
+            indptr[i + 1] = pos
+        
+        order, _, count = kernel(indptr, indices, in_degree)
+        if count < len(nodes):
+            # Graph has cycles; leave it to the approximate approach
+            return None
+        
+        return [nodes[i] for i in order]
+    
     def _approximate_generation_order(self, G: nx.DiGraph) -> List[str]:
         """
         Determine an approximate generation order for graphs with cycles
@@ -151,15 +499,77 @@ class DependencyManager:
         Returns:
             List of component IDs in approximate generation order
         """
-        # Break cycles by removing edges with minimum feedback arc set
-        feedback_edges = nx.algorithms.minimum_feedback_arc_set(G)
+        # The Eades vertex ordering only violates feedback arcs, so it is
+        # already a valid order for the graph with those arcs removed
+        order, _ = self._greedy_feedback_arc_set(G)
+        return order
+    
+    def _greedy_feedback_arc_set(self, G: nx.DiGraph) -> Tuple[List[str], Set[Tuple[str, str]]]:
+        """
+        Approximate a minimum feedback arc set using the Eades-Lin-Smyth heuristic
         
-        # Create a new graph without the feedback edges
-        G_acyclic = G.copy()
-        G_acyclic.remove_edges_from(feedback_edges)
+        Sinks are peeled to the end of the ordering and sources to the front;
+        when neither exists, the vertex with the largest out-degree minus
+        in-degree is moved to the front. Edges pointing backwards in the
+        resulting ordering form the feedback arc set.
         
-        # Return the topological sort of the acyclic graph
-        return list(nx.topological_sort(G_acyclic))
+        Args:
+            G: NetworkX DiGraph representing the dependency graph
+            
+        Returns:
+            Tuple of (vertex ordering, set of feedback edges)
+        """
+        in_degree = dict(G.in_degree())
+        out_degree = dict(G.out_degree())
+        remaining = set(G.nodes())
+        position = {node: i for i, node in enumerate(G.nodes())}
+        
+        sinks = deque(node for node in G.nodes() if out_degree[node] == 0)
+        sources = deque(node for node in G.nodes() if in_degree[node] == 0 and out_degree[node] > 0)
+        # Max-heap on out-degree minus in-degree, with stale entries skipped on pop
+        candidates = [(in_degree[node] - out_degree[node], position[node], node) for node in G.nodes()]
+        heapq.heapify(candidates)
+        
+        s1 = []
+        s2 = deque()
+        
+        def remove(node):
+            remaining.discard(node)
+            for pred in G.predecessors(node):
+                if pred in remaining:
+                    out_degree[pred] -= 1
+                    if out_degree[pred] == 0:
+                        sinks.append(pred)
+                    heapq.heappush(candidates, (in_degree[pred] - out_degree[pred], position[pred], pred))
+            for succ in G.successors(node):
+                if succ in remaining:
+                    in_degree[succ] -= 1
+                    if in_degree[succ] == 0:
+                        sources.append(succ)
+                    heapq.heappush(candidates, (in_degree[succ] - out_degree[succ], position[succ], succ))
+        
+        while remaining:
+            if sinks:
+                node = sinks.popleft()
+                if node in remaining:
+                    s2.appendleft(node)
+                    remove(node)
+            elif sources:
+                node = sources.popleft()
+                if node in remaining:
+                    s1.append(node)
+                    remove(node)
+            else:
+                delta, _, node = heapq.heappop(candidates)
+                if node in remaining and delta == in_degree[node] - out_degree[node]:
+                    s1.append(node)
+                    remove(node)
+        
+        order = s1 + list(s2)
+        rank = {node: i for i, node in enumerate(order)}
+        feedback_edges = {(u, v) for u, v in G.edges() if rank[u] > rank[v]}
+        
+        return order, feedback_edges
     
     def _identify_critical_path(self, G: nx.DiGraph, generation_order: List[str]) -> List[str]:
         """
@@ -175,46 +585,38 @@ class DependencyManager:
         if not generation_order:
             return []
         
-        # Create a weighted graph based on component complexity
-        weighted_G = G.copy()
-        
-        # Assign weights to edges based on approximate component complexity
-        for u, v in G.edges():
-            weighted_G[u][v]['weight'] = 1
+        in_deg = dict(G.in_degree())
+        out_deg = dict(G.out_degree())
         
         # Find the longest path from any start node to any end node
-        start_nodes = [node for node in G.nodes() if G.in_degree(node) == 0]
-        end_nodes = [node for node in G.nodes() if G.out_degree(node) == 0]
+        start_nodes = [node for node, degree in in_deg.items() if degree == 0]
+        end_nodes = [node for node, degree in out_deg.items() if degree == 0]
         
         if not start_nodes or not end_nodes:
             # If no clear start/end nodes, use first and last in generation order
             return [generation_order[0], generation_order[-1]]
         
-        # Find the longest path
-        longest_path = []
-        max_length = -1
-        
-        for start in start_nodes:
-            for end in end_nodes:
-                try:
-                    path = nx.dag_longest_path(weighted_G, weight='weight', source=start, target=end)
-                    length = nx.dag_longest_path_length(weighted_G, weight='weight', source=start, target=end)
-                    
-                    if length > max_length:
-                        max_length = length
-                        longest_path = path
-                except (nx.NetworkXNoPath, nx.NetworkXError):
-                    # No path exists or graph has cycles
-                    continue
-        
-        return longest_path
+        # Every edge counts as one unit, so no weighted copy of the graph is needed
+        try:
+            return nx.dag_longest_path(G)
+        except (nx.NetworkXUnfeasible, nx.NetworkXError):
+            # Graph has cycles
+            return []
     
-    def _calculate_dependency_complexity(self, G: nx.DiGraph) -> Dict[str, Any]:
+    def _calculate_dependency_complexity(self,
+                                         G: nx.DiGraph,
+                                         dependency_graph: Dict[str, List[str]],
+                                         critical_path: List[str]) -> Dict[str, Any]:
         """
         Calculate complexity metrics for the dependency graph
         
+        The diameter is only computed when the "compute_diameter" config
+        option is set, since the all-pairs search dominates on large graphs.
+        
         Args:
             G: NetworkX DiGraph representing the dependency graph
+            dependency_graph: Dictionary mapping component IDs to their dependencies
+            critical_path: Critical path from _identify_critical_path
             
         Returns:
             Dictionary of complexity metrics
@@ -222,10 +624,11 @@ class DependencyManager:
         num_nodes = G.number_of_nodes()
         num_edges = G.number_of_edges()
         
-        # Calculate average degree
+        # Calculate average degree; every edge adds one to both the total
+        # in-degree and the total out-degree, so both sums equal the edge count
         if num_nodes > 0:
-            avg_in_degree = sum(d for n, d in G.in_degree()) / num_nodes
-            avg_out_degree = sum(d for n, d in G.out_degree()) / num_nodes
+            avg_in_degree = num_edges / num_nodes
+            avg_out_degree = avg_in_degree
         else:
             avg_in_degree = 0
             avg_out_degree = 0
@@ -236,15 +639,23 @@ class DependencyManager:
         else:
             density = 0
         
-        # Calculate diameter (if graph is connected)
-        diameter = -1
-        try:
-            UG = G.to_undirected()
-            if nx.is_connected(UG):
-                diameter = nx.diameter(UG)
-        except nx.NetworkXError:
-            # Graph is not connected or has other issues
-            pass
+        is_dag = nx.is_directed_acyclic_graph(G)
+        
+        # Calculate diameter (opt-in, and only if graph is connected)
+        diameter = None
+        if self.config.get("compute_diameter", False):
+            diameter = -1
+            try:
+                if len(self._connected_groups(dependency_graph)) == 1:
+                    if is_dag:
+                        # The critical path is the longest path in a DAG, so its
+                        # length stands in for the diameter without an all-pairs search
+                        diameter = max(len(critical_path) - 1, 0)
+                    else:
+                        diameter = nx.diameter(G.to_undirected())
+            except nx.NetworkXError:
+                # Graph is not connected or has other issues
+                pass
         
         return {
             "node_count": num_nodes,
@@ -253,11 +664,32 @@ class DependencyManager:
             "avg_out_degree": avg_out_degree,
             "density": density,
             "diameter": diameter,
-            "is_dag": nx.is_directed_acyclic_graph(G),
+            "is_dag": is_dag,
             "components": nx.number_strongly_connected_components(G)
         }
     
-    def validate_dependencies(self, components: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _connected_groups(self, dependency_graph: Dict[str, List[str]]) -> List[List[str]]:
+        """
+        Group components into weakly connected components using union-find
+        
+        Args:
+            dependency_graph: Dictionary mapping component IDs to their dependencies
+            
+        Returns:
+            List of connected components, each a list of component IDs
+        """
+        uf = _UnionFind(dependency_graph)
+        for node, dependencies in dependency_graph.items():
+            for dep in dependencies:
+                uf.union(node, dep)
+        
+        groups = defaultdict(list)
+        for node in dependency_graph:
+            groups[uf.find(node)].append(node)
+        
+        return list(groups.values())
+    
+    def validate_dependencies(self, components: List[Dict[str, Any]]) -> ValidationResult:
         """
         Validate dependencies between components
         
@@ -265,61 +697,47 @@ class DependencyManager:
             components: List of component definitions
             
         Returns:
-            Dictionary containing validation results
+            ValidationResult containing validation results
         """
-        # Create dependency graph
-        dependency_graph = self._create_dependency_graph(components)
+        # Create dependency graph and NetworkX graph
+        (ids, names, deps_lists), dependency_graph, G = self._cached_graph(components)
         
-        # Create NetworkX graph
-        G = self._create_networkx_graph(dependency_graph)
+        # Check for cycles, enumerating them only when there are any
+        has_cycles = not nx.is_directed_acyclic_graph(G)
+        cycles = list(_iter_back_edge_cycles(G.adj, self.config.get("max_cycles", 10))) if has_cycles else []
         
-        # Check for cycles
-        cycles = list(nx.simple_cycles(G))
-        has_cycles = len(cycles) > 0
-        
-        # Check for missing dependencies
+        # Check for missing dependencies against known IDs and names
+        ids_set = frozenset(dependency_graph)
+        names_set = frozenset(name for name in names if name)
         missing_dependencies = []
-        for component in components:
-            component_id = component.get("id")
-            dependencies = component.get("depends_on", [])
-            
+        for component_id, dependencies in zip(ids, deps_lists):
             for dependency in dependencies:
-                # Check if dependency ID exists
-                if dependency not in dependency_graph:
-                    # Check if it's a component name rather than ID
-                    found = False
-                    for other_component in components:
-                        if other_component.get("name") == dependency:
-                            found = True
-                            break
-                    
-                    if not found:
-                        missing_dependencies.append({
-                            "component_id": component_id,
-                            "missing_dependency": dependency
-                        })
+                if dependency not in ids_set and dependency not in names_set:
+                    missing_dependencies.append({
+                        "component_id": component_id,
+                        "missing_dependency": dependency
+                    })
         
         # Check for islands (disconnected components)
-        UG = G.to_undirected()
-        connected_components = list(nx.connected_components(UG))
+        connected_components = self._connected_groups(dependency_graph)
         islands = []
         
         if len(connected_components) > 1:
             # Find single-node components
             for component in connected_components:
                 if len(component) == 1:
-                    islands.extend(list(component))
-        
-        return {
-            "valid": not has_cycles and not missing_dependencies,
-            "has_cycles": has_cycles,
-            "cycles": cycles,
-            "missing_dependencies": missing_dependencies,
-            "islands": islands,
-            "connected_components": [list(component) for component in connected_components]
-        }
+                    islands.extend(component)
+        
+        return ValidationResult(
+            valid=not has_cycles and not missing_dependencies,
+            has_cycles=has_cycles,
+            cycles=cycles,
+            missing_dependencies=missing_dependencies,
+            islands=islands,
+            connected_components=connected_components
+        )
     
-    def suggest_parallel_execution(self, components: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def suggest_parallel_execution(self, components: List[Dict[str, Any]]) -> ParallelPlan:
         """
         Suggest components that can be executed in parallel
         
@@ -327,43 +745,34 @@ class DependencyManager:
             components: List of component definitions
             
         Returns:
-            Dictionary containing parallelization suggestions
+            ParallelPlan containing parallelization suggestions
         """
-        # Analyze dependencies
-        analysis = self.analyze_dependencies(components)
-        
-        # Create NetworkX graph
-        dependency_graph = analysis["dependency_graph"]
-        G = self._create_networkx_graph(dependency_graph)
-        
-        # Get generation order
-        generation_order = analysis["generation_order"]
+        # Only the generation order is needed, so skip the full analysis
+        (ids, names, _), dependency_graph, G = self._cached_graph(components)
+        generation_order = self._determine_generation_order(G)
         
-        # Group components by their topological "level"
+        # Group components by their topological "level": walking the
+        # generation order guarantees predecessors are assigned first
+        pred_map = {node: list(G.predecessors(node)) for node in G.nodes()}
         levels = {}
-        for node in G.nodes():
-            # Calculate the longest path to this node
-            try:
-                level = 0
-                for predecessor in G.predecessors(node):
-                    level = max(level, levels.get(predecessor, 0) + 1)
-                levels[node] = level
-            except Exception:
-                # Fall back to simple approach if error occurs
-                levels[node] = len(list(G.predecessors(node)))
+        for node in generation_order:
+            # Predecessors not yet assigned are only reachable through a
+            # broken cycle edge, so they don't constrain this node's level
+            levels[node] = 1 + max(
+                (levels[pred] for pred in pred_map[node] if pred in levels),
+                default=-1
+            )
         
         # Group nodes by level
-        level_groups = {}
+        level_groups = defaultdict(list)
         for node, level in levels.items():
-            if level not in level_groups:
-                level_groups[level] = []
             level_groups[level].append(node)
         
         # Sort groups by level
         parallel_groups = [nodes for level, nodes in sorted(level_groups.items())]
         
         # Get component names for better readability
-        component_names = {component.get("id"): component.get("name") for component in components}
+        component_names = dict(zip(ids, names))
         
         named_groups = []
         for group in parallel_groups:
@@ -376,12 +785,12 @@ class DependencyManager:
         # Calculate maximum parallel workers needed
         max_parallel = max(len(group) for group in parallel_groups) if parallel_groups else 0
         
-        return {
-            "parallel_groups": named_groups,
-            "max_parallel_workers": max_parallel,
-            "generation_order": generation_order,
-            "level_count": len(parallel_groups)
-        }
+        return ParallelPlan(
+            parallel_groups=named_groups,
+            max_parallel_workers=max_parallel,
+            generation_order=generation_order,
+            level_count=len(parallel_groups)
+        )
 
 
 # Test the dependency manager if run directly
@@ -427,12 +836,12 @@ if __name__ == "__main__":
     
     analysis = dependency_manager.analyze_dependencies(test_components)
     print("Dependency Analysis:")
-    print(json.dumps(analysis, indent=2))
+    print(json.dumps(analysis.to_dict(), indent=2))
     
     validation = dependency_manager.validate_dependencies(test_components)
     print("\nDependency Validation:")
-    print(json.dumps(validation, indent=2))
+    print(json.dumps(validation.to_dict(), indent=2))
     
     parallel = dependency_manager.suggest_parallel_execution(test_components)
     print("\nParallel Execution Suggestion:")
-    print(json.dumps(parallel, indent=2))
+    print(json.dumps(parallel.to_dict(), indent=2))
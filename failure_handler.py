@@ -7,12 +7,62 @@ import os
 import re
 import json
 import logging
-from typing import Dict, List, Any, Optional, Tuple, Set
+from collections import deque
+from typing import Dict, List, Any, Optional, Tuple, Set, ClassVar
 from enum import Enum
+from types import MappingProxyType
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Patterns indicating hallucinated content in a generated script, keyed by
+# the named group each one gets in the combined regex below
+_HALLUCINATION_PATTERNS = {
+    "nonexistent": (r'import\s+(?P<module>[a-zA-Z_][a-zA-Z0-9_]*)\s+#\s+This\s+(?:module|package)\s+doesn\'t\s+exist',
+                    "Reference to non-existent module"),
+    "fictional": (r'#\s+Note:.*(?:doesn\'t exist|not available|fictional|made up)',
+                  "Acknowledgment of fictional element"),
+    "todo": (r'#\s+TODO:.*(?:find|create|develop|implement)',
+             "TODO for implementing required functionality")
+}
+
+# Patterns for comments indicating the model is unsure/guessing
+_UNCERTAINTY_PATTERNS = {
+    "unsure": r'#\s+(?:I\'m|I am)\s+(?:not sure|uncertain|guessing)',
+    "placeholder": r'#\s+(?:This is|Here\'s)\s+(?:an example|a placeholder)',
+    "install": r'#\s+(?:You may need to|You\'ll need to)\s+install'
+}
+
+# All of the above fused into one alternation so the script is scanned once
+_COMBINED_HALLUCINATION_RE = re.compile('|'.join(
+    [f'(?P<{name}>{pattern})' for name, (pattern, _) in _HALLUCINATION_PATTERNS.items()]
+    + [f'(?P<{name}>{pattern})' for name, pattern in _UNCERTAINTY_PATTERNS.items()]
+))
+
+# Upper bound on matches reported per hallucination pattern
+_MAX_REPORTED_MATCHES = 64
+
+# Docstring delimiters and non-blank line starts, used by the quality
+# metrics; the line regex captures '#' for comment lines and '' for code
+# lines, and [^\S\n] is whitespace that doesn't cross a line break
+_DOCSTRING_DELIMITER_RE = re.compile(r'"""|\'\'\'')
+_LINE_KIND_RE = re.compile(r'^[^\S\n]*(?:(#)|\S)', re.MULTILINE)
+
+# Keywords marking a requirement as a candidate for simplification
+_COMPLEX_KEYWORDS_RE = re.compile(
+    r'advanced|complex|comprehensive|sophisticated|extensive|high-performance|'
+    r'real-time|multi-threaded|concurrent|distributed|secure|encryption',
+    re.IGNORECASE
+)
+
+# Script ending in the middle of a word
+_TRAILING_WORD_RE = re.compile(r'[a-zA-Z]{3,}\Z')
+
 
 class FailureType(Enum):
     """Types of script generation failures"""
@@ -39,11 +89,250 @@ class RecoveryStrategy(Enum):
     ABORT = "abort"
 
 
+# Error message fragments identifying each failure type, in priority order
+_DEFAULT_FAILURE_PATTERNS = MappingProxyType({
+    FailureType.CONTEXT_OVERFLOW: (
+        "context length exceeded",
+        "maximum context length",
+        "token limit exceeded",
+        "input is too long",
+        "too many tokens",
+        "context window full"
+    ),
+    FailureType.SYNTAX_ERROR: (
+        "syntax error",
+        "invalid syntax",
+        "unexpected token",
+        "unexpected end of file",
+        "parsing error"
+    ),
+    FailureType.TRUNCATED_OUTPUT: (
+        "output was truncated",
+        "incomplete response",
+        "unfinished code block",
+        "ended abruptly"
+    ),
+    FailureType.MISSING_FEATURE: (
+        "feature not implemented",
+        "not supported",
+        "capability not available"
+    ),
+    FailureType.HALLUCINATION: (
+        "reference to undefined",
+        "non-existent module",
+        "unknown library",
+        "not a valid"
+    ),
+    FailureType.RATE_LIMIT: (
+        "rate limit exceeded",
+        "too many requests",
+        "request throttled"
+    ),
+    FailureType.API_ERROR: (
+        "api error",
+        "service unavailable",
+        "internal server error",
+        "bad gateway"
+    ),
+    FailureType.TIMEOUT: (
+        "request timed out",
+        "timeout exceeded",
+        "connection timed out"
+    )
+})
+
+# Model selection criteria used by the change-model recovery strategy
+_MODEL_CRITERIA = MappingProxyType({
+    FailureType.CONTEXT_OVERFLOW: MappingProxyType({
+        "min_context_length": 100000,
+        "preferred_features": ("long context",)
+    }),
+    FailureType.SYNTAX_ERROR: MappingProxyType({
+        "preferred_features": ("code generation", "instruction following")
+    }),
+    FailureType.MISSING_FEATURE: MappingProxyType({
+        "preferred_features": ("comprehensive capabilities", "code generation")
+    }),
+    FailureType.HALLUCINATION: MappingProxyType({
+        "preferred_features": ("factual accuracy", "code generation")
+    }),
+    FailureType.LOW_QUALITY: MappingProxyType({
+        "quality_threshold": 0.8,
+        "preferred_features": ("code quality", "comprehensive reasoning")
+    })
+})
+_DEFAULT_MODEL_CRITERIA = MappingProxyType({
+    "quality_threshold": 0.75
+})
+
+# Provider preferences used by the change-provider recovery strategy; an
+# empty tuple means any provider other than the current one
+_PREFERRED_PROVIDERS = MappingProxyType({
+    FailureType.CONTEXT_OVERFLOW: ("claude", "openai"),
+    FailureType.SYNTAX_ERROR: ("deepseek", "openai"),
+    FailureType.HALLUCINATION: ("deepseek", "openai"),
+    FailureType.MISSING_FEATURE: ("openai", "claude"),
+    FailureType.RATE_LIMIT: (),
+    FailureType.API_ERROR: ()
+})
+_DEFAULT_PREFERRED_PROVIDERS = ("openai", "claude", "deepseek")
+
+# Plain-string values of the enums above, so building result dicts doesn't
+# go through the Enum.value descriptor on every access
+_FT_VALUES = {failure_type: failure_type.value for failure_type in FailureType}
+_RS_VALUES = {strategy: strategy.value for strategy in RecoveryStrategy}
+
+# Reverse lookup of RecoveryStrategy members by value
+_RS_FROM_STR = RecoveryStrategy._value2member_map_
+
+
+def _to_recovery_strategy(strategy: Any) -> RecoveryStrategy:
+    """
+    Coerce a strategy value string to a RecoveryStrategy member
+    
+    Members pass through unchanged; value strings are looked up directly
+    instead of going through the Enum constructor.
+    
+    Args:
+        strategy: RecoveryStrategy member or its string value
+        
+    Returns:
+        RecoveryStrategy member
+    """
+    if strategy.__class__ is RecoveryStrategy:
+        return strategy
+    try:
+        return _RS_FROM_STR[strategy]
+    except (KeyError, TypeError):
+        # Unknown strings raise the Enum's usual ValueError; anything else
+        # passes through as before
+        return RecoveryStrategy(strategy) if isinstance(strategy, str) else strategy
+
+
+# Batches of at least this many error messages use the Numba DFA kernel
+_NUMBA_BATCH_THRESHOLD = 1000
+
+# Priority recorded for DFA states where no failure pattern ends
+_NO_MATCH_PRIORITY = 2 ** 31 - 1
+
+_ac_batch_kernel = None
+
+
+def _get_ac_batch_kernel():
+    """
+    Compile the batch Aho-Corasick scanning kernel on first use
+    
+    Numba is imported lazily so handlers that never triage batches don't pay for it.
+    
+    Returns:
+        Compiled kernel function, or None if Numba is not installed
+    """
+    global _ac_batch_kernel
+    
+    if _ac_batch_kernel is None:
+        try:
+            import numpy as np
+            from numba import njit
+        except ImportError:
+            logger.debug("Numba not installed, triaging error batches one message at a time")
+            _ac_batch_kernel = False
+            return None
+        
+        @njit(cache=True)
+        def ac_scan_batch(goto, output, buf, offsets):
+            """Run the DFA over each message slice of buf, returning the best priority matched in each"""
+            n = offsets.shape[0] - 1
+            results = np.empty(n, dtype=np.int32)
+            
+            for i in range(n):
+                state = 0
+                best = output[0]
+                for k in range(offsets[i], offsets[i + 1]):
+                    if best == 0:
+                        break
+                    state = goto[state, buf[k]]
+                    if output[state] < best:
+                        best = output[state]
+                results[i] = best
+            
+            return results
+        
+        _ac_batch_kernel = ac_scan_batch
+    
+    return _ac_batch_kernel or None
+
+
 class FailureHandler:
     """
     Handles detection and recovery from script generation failures
     """
     
+    __slots__ = (
+        "_config",
+        "_failure_patterns",
+        "strategy_history",
+        "_flat_patterns",
+        "_ac",
+        "_strategy_map",
+        "_strategy_config",
+        "_selection_cache",
+        "_dfa"
+    )
+    
+    # Default strategy map
+    _DEFAULT_STRATEGIES: ClassVar[Dict[FailureType, Tuple[RecoveryStrategy, ...]]] = {
+        FailureType.CONTEXT_OVERFLOW: (
+            RecoveryStrategy.DECOMPOSE,
+            RecoveryStrategy.SIMPLIFY,
+            RecoveryStrategy.CHANGE_MODEL
+        ),
+        FailureType.SYNTAX_ERROR: (
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.CHANGE_MODEL,
+            RecoveryStrategy.SIMPLIFY
+        ),
+        FailureType.TRUNCATED_OUTPUT: (
+            RecoveryStrategy.DECOMPOSE,
+            RecoveryStrategy.SIMPLIFY,
+            RecoveryStrategy.CHANGE_MODEL
+        ),
+        FailureType.MISSING_FEATURE: (
+            RecoveryStrategy.CHANGE_MODEL,
+            RecoveryStrategy.CHANGE_PROVIDER,
+            RecoveryStrategy.SIMPLIFY
+        ),
+        FailureType.HALLUCINATION: (
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.CHANGE_MODEL,
+            RecoveryStrategy.CHANGE_PROVIDER
+        ),
+        FailureType.LOW_QUALITY: (
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.CHANGE_MODEL,
+            RecoveryStrategy.SIMPLIFY
+        ),
+        FailureType.RATE_LIMIT: (
+            RecoveryStrategy.CHANGE_PROVIDER,
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.ABORT
+        ),
+        FailureType.API_ERROR: (
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.CHANGE_PROVIDER,
+            RecoveryStrategy.ABORT
+        ),
+        FailureType.TIMEOUT: (
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.CHANGE_PROVIDER,
+            RecoveryStrategy.SIMPLIFY
+        ),
+        FailureType.UNKNOWN: (
+            RecoveryStrategy.RETRY,
+            RecoveryStrategy.CHANGE_MODEL,
+            RecoveryStrategy.CHANGE_PROVIDER
+        )
+    }
+    
     def __init__(self, config: Dict[str, Any] = None):
         """
         Initialize the failure handler
@@ -51,10 +340,62 @@ class FailureHandler:
         Args:
             config: Configuration dictionary with failure handling settings
         """
+        # Pattern tables are built on first use, see failure_patterns
+        self._failure_patterns = None
+        self._flat_patterns = None
+        self._ac = None
+        self._dfa = None
+        # Strategy table, built from the config on first use, see _get_strategy_map
+        self._strategy_map = None
+        self._strategy_config = None
+        self._selection_cache = {}
         self.config = config or {}
-        self.failure_patterns = self._initialize_failure_patterns()
         self.strategy_history = {}
     
+    @property
+    def config(self) -> Dict[str, Any]:
+        """Configuration dictionary with failure handling settings"""
+        return self._config
+    
+    @config.setter
+    def config(self, config: Dict[str, Any]) -> None:
+        self._config = config
+        self.reload_strategies()
+    
+    @property
+    def failure_patterns(self) -> Dict[FailureType, List[str]]:
+        """Patterns for detecting each failure type, initialized on first access"""
+        if self._failure_patterns is None:
+            self._failure_patterns = self._initialize_failure_patterns()
+        return self._failure_patterns
+    
+    @failure_patterns.setter
+    def failure_patterns(self, failure_patterns: Dict[FailureType, List[str]]) -> None:
+        self._failure_patterns = failure_patterns
+        
+        # Matchers derived from the old patterns are rebuilt on next use
+        self._flat_patterns = None
+        self._ac = None
+        self._dfa = None
+        
+        # As are the strategy table and the selections made from it
+        self._strategy_map = None
+        self._selection_cache.clear()
+    
+    def _build_matchers(self) -> None:
+        """
+        Build the single-message matchers from the failure patterns
+        
+        Sets the flat (lowercased pattern, failure type) list used as the
+        fallback scan and the Aho-Corasick automaton, if available.
+        """
+        self._flat_patterns = [
+            (pattern.lower(), failure_type)
+            for failure_type, patterns in self.failure_patterns.items()
+            for pattern in patterns
+        ]
+        self._ac = self._build_pattern_automaton(self.failure_patterns)
+    
     def _initialize_failure_patterns(self) -> Dict[FailureType, List[str]]:
         """
         Initialize patterns for detecting different types of failures
@@ -63,54 +404,8 @@ class FailureHandler:
             Dictionary mapping failure types to pattern lists
         """
         default_patterns = {
-            FailureType.CONTEXT_OVERFLOW: [
-                "context length exceeded",
-                "maximum context length",
-                "token limit exceeded",
-                "input is too long",
-                "too many tokens",
-                "context window full"
-            ],
-            FailureType.SYNTAX_ERROR: [
-                "syntax error",
-                "invalid syntax",
-                "unexpected token",
-                "unexpected end of file",
-                "parsing error"
-            ],
-            FailureType.TRUNCATED_OUTPUT: [
-                "output was truncated",
-                "incomplete response",
-                "unfinished code block",
-                "ended abruptly"
-            ],
-            FailureType.MISSING_FEATURE: [
-                "feature not implemented",
-                "not supported",
-                "capability not available"
-            ],
-            FailureType.HALLUCINATION: [
-                "reference to undefined",
-                "non-existent module",
-                "unknown library",
-                "not a valid"
-            ],
-            FailureType.RATE_LIMIT: [
-                "rate limit exceeded",
-                "too many requests",
-                "request throttled"
-            ],
-            FailureType.API_ERROR: [
-                "api error",
-                "service unavailable",
-                "internal server error",
-                "bad gateway"
-            ],
-            FailureType.TIMEOUT: [
-                "request timed out",
-                "timeout exceeded",
-                "connection timed out"
-            ]
+            failure_type: list(patterns)
+            for failure_type, patterns in _DEFAULT_FAILURE_PATTERNS.items()
         }
         
         # Update with config values if available
@@ -127,6 +422,34 @@ class FailureHandler:
         
         return default_patterns
     
+    def _build_pattern_automaton(self, failure_patterns: Dict[FailureType, List[str]]):
+        """
+        Build an Aho-Corasick automaton matching all failure patterns at once
+        
+        Args:
+            failure_patterns: Dictionary mapping failure types to pattern lists
+            
+        Returns:
+            Automaton mapping each lowercased pattern to (priority, failure_type),
+            or None if pyahocorasick is not installed
+        """
+        if ahocorasick is None:
+            return None
+        
+        automaton = ahocorasick.Automaton()
+        for priority, (failure_type, patterns) in enumerate(failure_patterns.items()):
+            for pattern in patterns:
+                pattern_lower = pattern.lower()
+                # Earlier failure types keep precedence for shared patterns
+                if pattern_lower and not automaton.exists(pattern_lower):
+                    automaton.add_word(pattern_lower, (priority, failure_type))
+        
+        if len(automaton) == 0:
+            return None
+        
+        automaton.make_automaton()
+        return automaton
+    
     def detect_failure(self, script_generation_result: Dict[str, Any]) -> Tuple[bool, Optional[FailureType], Dict[str, Any]]:
         """
         Detect if a script generation has failed and identify the failure type
@@ -146,7 +469,7 @@ class FailureHandler:
             
             return True, failure_type, {
                 "error_message": error_message,
-                "failure_type": failure_type.value if failure_type else None
+                "failure_type": _FT_VALUES[failure_type] if failure_type else None
             }
         
         # Check for implicit failures in the generated script
@@ -192,13 +515,113 @@ class FailureHandler:
         """
         error_lower = error_message.lower()
         
-        for failure_type, patterns in self.failure_patterns.items():
-            for pattern in patterns:
-                if pattern.lower() in error_lower:
-                    return failure_type
+        if self._flat_patterns is None:
+            self._build_matchers()
+        
+        if self._ac is not None:
+            # Single pass over the message; the highest-priority match wins,
+            # matching the precedence of the pattern-by-pattern scan below
+            best = None
+            for _, match in self._ac.iter(error_lower):
+                if best is None or match[0] < best[0]:
+                    best = match
+                    if best[0] == 0:
+                        break
+            return best[1] if best else FailureType.UNKNOWN
+        
+        # Patterns were lowercased once at init, in priority order
+        for pattern, failure_type in self._flat_patterns:
+            if pattern in error_lower:
+                return failure_type
         
         return FailureType.UNKNOWN
     
+    def identify_failure_types(self, error_messages: List[str]) -> List[FailureType]:
+        """
+        Identify the types of failure for a batch of error messages
+        
+        Large batches (e.g. re-classifying historical error logs) are scanned
+        in a single call to a Numba-compiled Aho-Corasick DFA when Numba is
+        installed; otherwise each message goes through _identify_failure_type.
+        
+        Args:
+            error_messages: Error messages from the generation process
+            
+        Returns:
+            List of FailureType enum values, one per message
+        """
+        kernel = None
+        if len(error_messages) >= self.config.get("numba_batch_threshold", _NUMBA_BATCH_THRESHOLD):
+            kernel = _get_ac_batch_kernel()
+        if kernel is None:
+            return [self._identify_failure_type(message) for message in error_messages]
+        
+        import numpy as np
+        
+        if self._dfa is None:
+            self._dfa = self._build_pattern_dfa()
+        goto, output = self._dfa
+        
+        # Concatenate the lowercased messages into one byte buffer with offsets
+        encoded = [message.lower().encode("utf-8", "surrogatepass") for message in error_messages]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(message) for message in encoded], out=offsets[1:])
+        buf = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        
+        priorities = kernel(goto, output, buf, offsets)
+        
+        failure_types = list(self.failure_patterns)
+        return [
+            failure_types[priority] if priority != _NO_MATCH_PRIORITY else FailureType.UNKNOWN
+            for priority in priorities.tolist()
+        ]
+    
+    def _build_pattern_dfa(self):
+        """
+        Build a dense Aho-Corasick DFA over the UTF-8 bytes of the failure patterns
+        
+        Returns:
+            Tuple of (goto, output) arrays: goto[state, byte] is the next state
+            with failure links folded in, and output[state] is the best (lowest)
+            failure-type priority of any pattern ending at that state
+        """
+        import numpy as np
+        
+        # Trie over the lowercased patterns; priority is the failure type's position
+        children = [{}]
+        output = [_NO_MATCH_PRIORITY]
+        for priority, patterns in enumerate(self.failure_patterns.values()):
+            for pattern in patterns:
+                state = 0
+                for byte in pattern.lower().encode("utf-8", "surrogatepass"):
+                    child = children[state].get(byte)
+                    if child is None:
+                        child = len(children)
+                        children[state][byte] = child
+                        children.append({})
+                        output.append(_NO_MATCH_PRIORITY)
+                    state = child
+                output[state] = min(output[state], priority)
+        
+        # Breadth-first pass computing failure links and the full transition table
+        goto = np.zeros((len(children), 256), dtype=np.int32)
+        fail = [0] * len(children)
+        queue = deque()
+        for byte, child in children[0].items():
+            goto[0, byte] = child
+            queue.append(child)
+        
+        while queue:
+            state = queue.popleft()
+            output[state] = min(output[state], output[fail[state]])
+            goto[state] = goto[fail[state]]
+            for byte, child in children[state].items():
+                fail[child] = goto[fail[state], byte]
+                goto[state, byte] = child
+                queue.append(child)
+        
+        return goto, np.array(output, dtype=np.int32)
+    
     def _is_truncated(self, script: str) -> bool:
         """
         Check if a script appears to be truncated
@@ -209,25 +632,25 @@ class FailureHandler:
         Returns:
             True if the script appears to be truncated
         """
-        # Check for obvious truncation indicators
-        truncation_indicators = [
-            # Unclosed brackets or parentheses
-            (script.count('{') != script.count('}')),
-            (script.count('(') != script.count(')')),
-            (script.count('[') != script.count(']')),
-            
+        # Check for obvious truncation indicators, cheapest first so a hit
+        # on the script's tail skips the full-length counts
+        return (
             # Abrupt ending
-            script.endswith('...'),
+            script.endswith('...')
             
-            # Unclosed triple quotes
-            (script.count('"""') % 2 != 0),
-            (script.count("'''") % 2 != 0),
+            # Ends in the middle of a word; only the last three characters
+            # can take part in a match anchored at the end
+            or _TRAILING_WORD_RE.search(script, max(len(script) - 3, 0)) is not None
             
-            # Ends in the middle of a word
-            bool(re.search(r'[a-zA-Z]{3,}\Z', script))
-        ]
-        
-        return any(truncation_indicators)
+            # Unclosed brackets or parentheses
+            or script.count('{') != script.count('}')
+            or script.count('(') != script.count(')')
+            or script.count('[') != script.count(']')
+            
+            # Unclosed triple quotes
+            or script.count('"""') % 2 != 0
+            or script.count("'''") % 2 != 0
+        )
     
     def _detect_hallucinations(self, script: str) -> Dict[str, Any]:
         """
@@ -242,34 +665,29 @@ class FailureHandler:
         has_hallucinations = False
         hallucination_indicators = []
         
-        # Check for common hallucination patterns
-        hallucination_patterns = [
-            (r'import\s+([a-zA-Z_][a-zA-Z0-9_]*)\s+#\s+This\s+(?:module|package)\s+doesn\'t\s+exist', 
-             "Reference to non-existent module"),
-            (r'#\s+Note:.*(?:doesn\'t exist|not available|fictional|made up)', 
-             "Acknowledgment of fictional element"),
-            (r'#\s+TODO:.*(?:find|create|develop|implement)', 
-             "TODO for implementing required functionality")
-        ]
+        # Single scan over the script, bucketing matches by pattern name
+        # (only uncertainty presence and a bounded number of hallucination
+        # matches are kept, so pathological outputs can't blow up the report)
+        matches_by_name = {}
+        for match in _COMBINED_HALLUCINATION_RE.finditer(script):
+            name = match.lastgroup
+            matches = matches_by_name.setdefault(name, [])
+            if name in _UNCERTAINTY_PATTERNS or len(matches) >= _MAX_REPORTED_MATCHES:
+                continue
+            matches.append(match.group("module" if name == "nonexistent" else name))
         
-        for pattern, description in hallucination_patterns:
-            matches = re.findall(pattern, script)
-            if matches:
+        # Check for common hallucination patterns
+        for name, (_, description) in _HALLUCINATION_PATTERNS.items():
+            if name in matches_by_name:
                 has_hallucinations = True
                 hallucination_indicators.append({
                     "description": description,
-                    "matches": matches
+                    "matches": matches_by_name[name]
                 })
         
         # Check for comments indicating the model is unsure/guessing
-        uncertainty_patterns = [
-            r'#\s+(?:I\'m|I am)\s+(?:not sure|uncertain|guessing)',
-            r'#\s+(?:This is|Here\'s)\s+(?:an example|a placeholder)',
-            r'#\s+(?:You may need to|You\'ll need to)\s+install'
-        ]
-        
-        for pattern in uncertainty_patterns:
-            if re.search(pattern, script):
+        for name, pattern in _UNCERTAINTY_PATTERNS.items():
+            if name in matches_by_name:
                 hallucination_indicators.append({
                     "description": "Expression of uncertainty in comments",
                     "matches": [pattern]
@@ -303,29 +721,49 @@ class FailureHandler:
         comment_lines = 0
         code_lines = 0
         
-        lines = script.split('\n')
+        # Walk the docstring delimiter lines only; the stretches of lines
+        # between them are classified in bulk with C-level regex scans
         in_docstring = False
         docstring_delimiters = 0
+        pos = 0
+        script_end = len(script)
         
-        for line in lines:
-            stripped = line.strip()
-            
-            # Check for docstring delimiters
-            if '"""' in stripped or "'''" in stripped:
-                docstring_delimiters += stripped.count('"""') + stripped.count("'''")
+        for match in _DOCSTRING_DELIMITER_RE.finditer(script):
+            if match.start() < pos:
+                # Another delimiter on a line that was already counted
+                docstring_delimiters += 1
                 in_docstring = docstring_delimiters % 2 != 0
-                doc_lines += 1
                 continue
-                
-            # If in docstring, count as documentation
+            
+            line_start = script.rfind('\n', 0, match.start()) + 1
+            line_end = script.find('\n', match.end())
+            if line_end == -1:
+                line_end = script_end
+            
+            # Lines between the previous delimiter line and this one
             if in_docstring:
-                doc_lines += 1
-            # If line starts with #, count as comment
-            elif stripped.startswith('#'):
-                comment_lines += 1
-            # Otherwise, if not empty, count as code
-            elif stripped:
-                code_lines += 1
+                doc_lines += script.count('\n', pos, line_start)
+            else:
+                line_kinds = _LINE_KIND_RE.findall(script, pos, line_start)
+                segment_comments = line_kinds.count('#')
+                comment_lines += segment_comments
+                code_lines += len(line_kinds) - segment_comments
+            
+            # The delimiter line itself always counts as documentation
+            doc_lines += 1
+            docstring_delimiters += 1
+            in_docstring = docstring_delimiters % 2 != 0
+            pos = line_end + 1
+        
+        # Lines after the last delimiter line
+        if pos <= script_end:
+            if in_docstring:
+                doc_lines += script.count('\n', pos) + 1
+            else:
+                line_kinds = _LINE_KIND_RE.findall(script, pos)
+                segment_comments = line_kinds.count('#')
+                comment_lines += segment_comments
+                code_lines += len(line_kinds) - segment_comments
         
         total_lines = doc_lines + comment_lines + code_lines
         doc_ratio = doc_lines / total_lines if total_lines > 0 else 0
@@ -356,6 +794,54 @@ class FailureHandler:
             }
         }
     
+    def _build_strategy_map(self) -> Dict[FailureType, Tuple[RecoveryStrategy, ...]]:
+        """
+        Resolve the recovery strategies to try for each failure type
+        
+        Returns:
+            Dictionary mapping failure types to strategy tuples, taken from
+            the "recovery_strategies" config entry or the class defaults
+        """
+        strategy_config = self.config.get("recovery_strategies", {})
+        
+        return {
+            failure_type: tuple(
+                _to_recovery_strategy(s)
+                for s in strategy_config.get(failure_type.value,
+                                             self._DEFAULT_STRATEGIES.get(failure_type, ()))
+            )
+            for failure_type in FailureType
+        }
+    
+    def reload_strategies(self) -> None:
+        """
+        Rebuild the strategy table from the config on next use
+        
+        Called when the config is replaced. Call it after editing the
+        "recovery_strategies" entry of the current config in place.
+        """
+        self._strategy_map = None
+        self._strategy_config = None
+        self._selection_cache.clear()
+    
+    def _get_strategy_map(self) -> Dict[FailureType, Tuple[RecoveryStrategy, ...]]:
+        """
+        Get the strategy table, building it on first use or when the
+        "recovery_strategies" config entry has been replaced
+        
+        Returns:
+            Dictionary mapping failure types to strategy tuples
+        """
+        strategy_config = self.config.get("recovery_strategies")
+        
+        # An identity check only; in-place edits go through reload_strategies
+        if self._strategy_map is None or strategy_config is not self._strategy_config:
+            self._strategy_map = self._build_strategy_map()
+            self._strategy_config = strategy_config
+            self._selection_cache.clear()
+        
+        return self._strategy_map
+    
     def recommend_recovery_strategy(self, 
                                    failure_type: FailureType,
                                    failure_details: Dict[str, Any],
@@ -375,85 +861,17 @@ class FailureHandler:
         """
         previous_attempts = previous_attempts or []
         
-        # Get strategies from configuration or use defaults
-        strategy_config = self.config.get("recovery_strategies", {})
-        
-        # Default strategy map
-        default_strategies = {
-            FailureType.CONTEXT_OVERFLOW: [
-                RecoveryStrategy.DECOMPOSE,
-                RecoveryStrategy.SIMPLIFY,
-                RecoveryStrategy.CHANGE_MODEL
-            ],
-            FailureType.SYNTAX_ERROR: [
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.CHANGE_MODEL,
-                RecoveryStrategy.SIMPLIFY
-            ],
-            FailureType.TRUNCATED_OUTPUT: [
-                RecoveryStrategy.DECOMPOSE,
-                RecoveryStrategy.SIMPLIFY,
-                RecoveryStrategy.CHANGE_MODEL
-            ],
-            FailureType.MISSING_FEATURE: [
-                RecoveryStrategy.CHANGE_MODEL,
-                RecoveryStrategy.CHANGE_PROVIDER,
-                RecoveryStrategy.SIMPLIFY
-            ],
-            FailureType.HALLUCINATION: [
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.CHANGE_MODEL,
-                RecoveryStrategy.CHANGE_PROVIDER
-            ],
-            FailureType.LOW_QUALITY: [
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.CHANGE_MODEL,
-                RecoveryStrategy.SIMPLIFY
-            ],
-            FailureType.RATE_LIMIT: [
-                RecoveryStrategy.CHANGE_PROVIDER,
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.ABORT
-            ],
-            FailureType.API_ERROR: [
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.CHANGE_PROVIDER,
-                RecoveryStrategy.ABORT
-            ],
-            FailureType.TIMEOUT: [
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.CHANGE_PROVIDER,
-                RecoveryStrategy.SIMPLIFY
-            ],
-            FailureType.UNKNOWN: [
-                RecoveryStrategy.RETRY,
-                RecoveryStrategy.CHANGE_MODEL,
-                RecoveryStrategy.CHANGE_PROVIDER
-            ]
-        }
-        
-        # Use config strategies if available, otherwise use defaults
-        strategies = strategy_config.get(failure_type.value, default_strategies.get(failure_type, []))
-        strategies = [RecoveryStrategy(s) if isinstance(s, str) else s for s in strategies]
-        
         # Determine which strategies have been tried already
-        tried_strategies = set()
-        for attempt in previous_attempts:
-            strategy = attempt.get("strategy")
-            if strategy:
-                tried_strategies.add(RecoveryStrategy(strategy) if isinstance(strategy, str) else strategy)
-        
-        # Filter out strategies that have been tried
-        available_strategies = [s for s in strategies if s not in tried_strategies]
+        tried_strategies = frozenset(
+            _to_recovery_strategy(strategy)
+            for strategy in (attempt.get("strategy") for attempt in previous_attempts)
+            if strategy
+        )
         
-        # If all strategies have been tried, fall back to human assistance or abort
-        if not available_strategies:
-            if RecoveryStrategy.HUMAN_ASSISTANCE not in tried_strategies:
-                recommended_strategy = RecoveryStrategy.HUMAN_ASSISTANCE
-            else:
-                recommended_strategy = RecoveryStrategy.ABORT
-        else:
-            recommended_strategy = available_strategies[0]
+        # Pick the next strategy to try
+        available_strategies, recommended_strategy = self._select_strategy(
+            failure_type, tried_strategies
+        )
         
         # Generate recovery instructions based on the recommended strategy
         recovery_instructions = self._generate_recovery_instructions(
@@ -464,12 +882,168 @@ class FailureHandler:
         )
         
         return {
-            "recommended_strategy": recommended_strategy.value,
-            "failure_type": failure_type.value,
+            "recommended_strategy": _RS_VALUES[recommended_strategy],
+            "failure_type": _FT_VALUES[failure_type],
             "recovery_instructions": recovery_instructions,
-            "available_strategies": [s.value for s in available_strategies],
-            "tried_strategies": [s.value for s in tried_strategies]
+            "available_strategies": [_RS_VALUES[s] for s in available_strategies],
+            "tried_strategies": [_RS_VALUES[s] for s in tried_strategies]
+        }
+    
+    def handle_failure(self,
+                       script_generation_result: Dict[str, Any],
+                       script_definition: Dict[str, Any],
+                       current_provider: Optional[str] = None,
+                       previous_attempts: List[Dict[str, Any]] = None) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Detect a failure, recommend a recovery and bind a replacement provider in one call
+        
+        Args:
+            script_generation_result: Result of script generation
+            script_definition: Original script definition
+            current_provider: Name of the provider that produced the result (optional)
+            previous_attempts: List of previous recovery attempts
+            
+        Returns:
+            None if no failure was detected, otherwise a tuple of
+            (new_provider, recommendation). new_provider is a ready provider
+            instance when the recommended strategy is to change provider and
+            one is available, or None to keep the current provider.
+        """
+        is_failure, failure_type, failure_details = self.detect_failure(script_generation_result)
+        if not is_failure:
+            return None
+        
+        return self._recover(failure_type, failure_details, script_definition, current_provider, previous_attempts)
+    
+    def check_context_budget(self,
+                             provider: Any,
+                             prompt: str,
+                             script_definition: Dict[str, Any],
+                             max_tokens: int = 4000,
+                             system_prompt: Optional[str] = None,
+                             previous_attempts: List[Dict[str, Any]] = None) -> Optional[Tuple[Any, Dict[str, Any]]]:
+        """
+        Check a request against the provider's context window before sending it
+        
+        A request that would overflow the context is handled like a
+        context-overflow failure, without spending a round-trip on it.
+        
+        Args:
+            provider: Provider instance the request would be sent to
+            prompt: The user prompt to send
+            script_definition: Original script definition
+            max_tokens: Maximum number of tokens to generate
+            system_prompt: System instructions for the model (optional)
+            previous_attempts: List of previous recovery attempts
+            
+        Returns:
+            None if the request fits, otherwise a tuple of (new_provider,
+            recommendation) as returned by handle_failure
+        """
+        if provider.fits_context(prompt, max_tokens, system_prompt):
+            return None
+        
+        failure_type = FailureType.CONTEXT_OVERFLOW
+        failure_details = {
+            "error_message": "Request exceeds the context window of the model",
+            "failure_type": _FT_VALUES[failure_type]
         }
+        
+        return self._recover(failure_type, failure_details, script_definition,
+                             provider.get_provider_name(), previous_attempts)
+    
+    def _recover(self,
+                 failure_type: FailureType,
+                 failure_details: Dict[str, Any],
+                 script_definition: Dict[str, Any],
+                 current_provider: Optional[str],
+                 previous_attempts: Optional[List[Dict[str, Any]]]) -> Tuple[Any, Dict[str, Any]]:
+        """
+        Recommend a recovery strategy and bind a replacement provider if needed
+        
+        Args:
+            failure_type: Type of failure
+            failure_details: Details about the failure
+            script_definition: Original script definition
+            current_provider: Name of the provider that failed (optional)
+            previous_attempts: List of previous recovery attempts
+            
+        Returns:
+            Tuple of (new_provider, recommendation)
+        """
+        recommendation = self.recommend_recovery_strategy(
+            failure_type,
+            failure_details,
+            script_definition,
+            previous_attempts
+        )
+        
+        new_provider = None
+        if recommendation["recommended_strategy"] == _RS_VALUES[RecoveryStrategy.CHANGE_PROVIDER]:
+            new_provider = self._find_alternative_provider(failure_type, current_provider)
+        
+        return new_provider, recommendation
+    
+    def _find_alternative_provider(self, failure_type: FailureType, current_provider: Optional[str] = None):
+        """
+        Get the first available provider suited to a failure type
+        
+        Args:
+            failure_type: Type of failure
+            current_provider: Name of the provider to avoid (optional)
+            
+        Returns:
+            Provider instance, or None if no other provider is available
+        """
+        from model_providers import get_provider
+        
+        # An empty preference list means any provider other than the current one
+        candidates = _PREFERRED_PROVIDERS.get(failure_type, _DEFAULT_PREFERRED_PROVIDERS) or _DEFAULT_PREFERRED_PROVIDERS
+        current = current_provider.lower() if current_provider else None
+        
+        for provider_name in candidates:
+            if provider_name == current:
+                continue
+            
+            # get_provider returns None for unknown, unconfigured or failing providers
+            provider = get_provider(provider_name)
+            if provider is not None:
+                return provider
+        
+        return None
+    
+    def _select_strategy(self,
+                         failure_type: FailureType,
+                         tried_strategies: frozenset) -> Tuple[Tuple[RecoveryStrategy, ...], RecoveryStrategy]:
+        """
+        Select the recovery strategy for a failure type given those already tried
+        
+        Args:
+            failure_type: Type of failure
+            tried_strategies: Strategies that have already been attempted
+            
+        Returns:
+            Tuple of (untried strategies in preference order, recommended strategy)
+        """
+        strategy_map = self._get_strategy_map()
+        
+        key = (failure_type, tried_strategies)
+        if key in self._selection_cache:
+            return self._selection_cache[key]
+        
+        # Filter out strategies that have been tried
+        available_strategies = tuple(s for s in strategy_map[failure_type] if s not in tried_strategies)
+        
+        # If all strategies have been tried, fall back to human assistance or abort
+        recommended_strategy = next(
+            iter(available_strategies),
+            RecoveryStrategy.HUMAN_ASSISTANCE
+            if RecoveryStrategy.HUMAN_ASSISTANCE not in tried_strategies
+            else RecoveryStrategy.ABORT
+        )
+        
+        self._selection_cache[key] = (available_strategies, recommended_strategy)
+        return available_strategies, recommended_strategy
     
     def _generate_recovery_instructions(self,
                                       strategy: RecoveryStrategy,
@@ -620,18 +1194,11 @@ class FailureHandler:
                 ]
             }
         
-        # Identify complex requirements
-        complex_keywords = [
-            "advanced", "complex", "comprehensive", "sophisticated",
-            "extensive", "high-performance", "real-time", "multi-threaded",
-            "concurrent", "distributed", "secure", "encryption"
-        ]
-        
-        # Identify requirements to simplify
+        # Identify requirements to simplify, scored by how many distinct
+        # complexity keywords each one mentions
         simplify_candidates = []
         for i, req in enumerate(requirements):
-            req_lower = req.lower()
-            complexity_score = sum(1 for keyword in complex_keywords if keyword in req_lower)
+            complexity_score = len({keyword.lower() for keyword in _COMPLEX_KEYWORDS_RE.findall(req)})
             if complexity_score > 0:
                 simplify_candidates.append((i, req, complexity_score))
         
@@ -730,35 +1297,11 @@ class FailureHandler:
         Returns:
             Dictionary with model change instructions
         """
-        # Define model selection criteria based on failure type
-        criteria = {}
-        
-        if failure_type == FailureType.CONTEXT_OVERFLOW:
-            criteria = {
-                "min_context_length": 100000,
-                "preferred_features": ["long context"]
-            }
-        elif failure_type == FailureType.SYNTAX_ERROR:
-            criteria = {
-                "preferred_features": ["code generation", "instruction following"]
-            }
-        elif failure_type == FailureType.MISSING_FEATURE:
-            criteria = {
-                "preferred_features": ["comprehensive capabilities", "code generation"]
-            }
-        elif failure_type == FailureType.HALLUCINATION:
-            criteria = {
-                "preferred_features": ["factual accuracy", "code generation"]
-            }
-        elif failure_type == FailureType.LOW_QUALITY:
-            criteria = {
-                "quality_threshold": 0.8,
-                "preferred_features": ["code quality", "comprehensive reasoning"]
-            }
-        else:
-            criteria = {
-                "quality_threshold": 0.75
-            }
+        # Look up model selection criteria based on failure type
+        criteria = {
+            key: list(value) if isinstance(value, tuple) else value
+            for key, value in _MODEL_CRITERIA.get(failure_type, _DEFAULT_MODEL_CRITERIA).items()
+        }
         
         return {
             "description": "Change to a more suitable model",
@@ -782,20 +1325,8 @@ class FailureHandler:
         Returns:
             Dictionary with provider change instructions
         """
-        # Define provider preferences based on failure type
-        preferred_providers = []
-        
-        if failure_type == FailureType.CONTEXT_OVERFLOW:
-            preferred_providers = ["claude", "openai"]
-        elif failure_type == FailureType.SYNTAX_ERROR or failure_type == FailureType.HALLUCINATION:
-            preferred_providers = ["deepseek", "openai"]
-        elif failure_type == FailureType.MISSING_FEATURE:
-            preferred_providers = ["openai", "claude"]
-        elif failure_type == FailureType.RATE_LIMIT or failure_type == FailureType.API_ERROR:
-            # Recommend any provider different from the current one
-            preferred_providers = []
-        else:
-            preferred_providers = ["openai", "claude", "deepseek"]
+        # Look up provider preferences based on failure type
+        preferred_providers = list(_PREFERRED_PROVIDERS.get(failure_type, _DEFAULT_PREFERRED_PROVIDERS))
         
         return {
             "description": "Change to a different provider",
@@ -817,21 +1348,18 @@ class FailureHandler:
             strategy: Recovery strategy that was attempted
             success: Whether the strategy was successful
         """
-        strategy_str = strategy.value if isinstance(strategy, RecoveryStrategy) else strategy
+        strategy_str = _RS_VALUES[strategy] if strategy.__class__ is RecoveryStrategy else strategy
         
-        if strategy_str not in self.strategy_history:
-            self.strategy_history[strategy_str] = {
+        stats = self.strategy_history.get(strategy_str)
+        if stats is None:
+            stats = self.strategy_history[strategy_str] = {
                 "success": 0,
                 "failure": 0,
                 "total": 0
             }
         
-        if success:
-            self.strategy_history[strategy_str]["success"] += 1
-        else:
-            self.strategy_history[strategy_str]["failure"] += 1
-            
-        self.strategy_history[strategy_str]["total"] += 1
+        stats["success" if success else "failure"] += 1
+        stats["total"] += 1
     
     def get_strategy_success_rates(self) -> Dict[str, float]:
         """
@@ -840,16 +1368,10 @@ class FailureHandler:
         Returns:
             Dictionary mapping strategy names to success rates
         """
-        success_rates = {}
-        
-        for strategy, stats in self.strategy_history.items():
-            total = stats["total"]
-            if total > 0:
-                success_rates[strategy] = stats["success"] / total
-            else:
-                success_rates[strategy] = 0.0
-        
-        return success_rates
+        return {
+            strategy: stats["success"] / stats["total"] if stats["total"] > 0 else 0.0
+            for strategy, stats in self.strategy_history.items()
+        }
 
 
 # Test the failure handler if run directly
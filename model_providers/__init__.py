@@ -5,59 +5,130 @@ Provides interfaces to various LLM providers
 
 import os
 import sys
+import asyncio
 import logging
 import importlib
 from typing import Dict, Any, List, Optional, Union
 
 logger = logging.getLogger(__name__)
 
+from .circuit_breaker import get_breaker
+from ._http import decode_json
+
 # Import server manager
 try:
     from .server_manager import get_server_manager
 except ImportError:
     logger.warning("Server manager not found, local model management may not be available")
 
-# Providers dictionary
+# Default location of the local model server configuration
+_SERVER_CONFIG_PATH = os.path.join('config', 'server_config.json')
+
+# Parsed server configs keyed by path, with the (mtime, size) they were read at
+_server_configs = {}
+
+def get_server_config(config_path: str = None) -> Optional[Dict[str, Any]]:
+    """
+    Get the parsed server configuration, re-reading the file only when it changes
+    
+    The returned dictionary is shared between callers and must be treated as
+    read-only; code that updates the config should load its own copy.
+    
+    Args:
+        config_path: Path to the configuration file, defaults to config/server_config.json
+        
+    Returns:
+        dict: Server configuration or None if the file does not exist
+    """
+    config_path = config_path or _SERVER_CONFIG_PATH
+    
+    try:
+        stat = os.stat(config_path)
+    except OSError:
+        return None
+    
+    version = (stat.st_mtime_ns, stat.st_size)
+    cached = _server_configs.get(config_path)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    with open(config_path, 'rb') as f:
+        config = decode_json(f.read())
+    
+    _server_configs[config_path] = (version, config)
+    return config
+
+# Provider name -> (module, class name), imported on first use
+_PROVIDER_SPECS = {
+    'claude': ('.claude_provider', 'ClaudeProvider'),
+    'openai': ('.openai_provider', 'OpenAIProvider'),
+    'deepseek': ('.deepseek_provider', 'DeepSeekProvider')
+}
+
+# Provider instances keyed by (provider_name, model_name)
 _providers = {}
 
-def get_provider(provider_name: str = None):
+def _make_factory(module_name: str, class_name: str):
+    """
+    Build a constructor for a provider that imports its class on first call
+    
+    Args:
+        module_name: Module path relative to this package
+        class_name: Name of the provider class in that module
+        
+    Returns:
+        Function taking an optional model name and returning a new provider instance
+    """
+    provider_class = None
+    
+    def factory(model_name: str = None):
+        nonlocal provider_class
+        if provider_class is None:
+            provider_class = getattr(importlib.import_module(module_name, __name__), class_name)
+        return provider_class(model=model_name) if model_name else provider_class()
+    
+    return factory
+
+# Provider name -> factory, so construction is a single lookup and call
+_PROVIDER_FACTORIES = {name: _make_factory(*spec) for name, spec in _PROVIDER_SPECS.items()}
+
+def get_provider(provider_name: str = None, model_name: str = None):
     """
     Get a provider instance by name
     
     Args:
         provider_name: Name of the provider (claude, openai, deepseek)
+        model_name: Model to use, defaults to the provider's default model
         
     Returns:
         Provider instance or None if not found
     """
-    global _providers
-    
     # Default to Claude if not specified
     if provider_name is None:
         provider_name = 'claude'
     
     provider_name = provider_name.lower()
+    key = (provider_name, model_name)
+    
+    factory = _PROVIDER_FACTORIES.get(provider_name)
+    if factory is None:
+        logger.error(f"Unknown provider: {provider_name}")
+        return None
+    
+    # Skip providers whose recent requests keep failing
+    if not get_breaker(provider_name).allow_request():
+        logger.warning(f"Provider {provider_name} is failing, skipping until its cooldown passes")
+        return None
     
     # Return cached provider if available
-    if provider_name in _providers:
-        return _providers[provider_name]
+    provider = _providers.get(key)
+    if provider is not None:
+        return provider
     
     try:
-        # Import the provider module
-        if provider_name == 'claude':
-            from .claude_provider import ClaudeProvider
-            _providers[provider_name] = ClaudeProvider()
-        elif provider_name == 'openai':
-            from .openai_provider import OpenAIProvider
-            _providers[provider_name] = OpenAIProvider()
-        elif provider_name == 'deepseek':
-            from .deepseek_provider import DeepSeekProvider
-            _providers[provider_name] = DeepSeekProvider()
-        else:
-            logger.error(f"Unknown provider: {provider_name}")
-            return None
-        
-        return _providers[provider_name]
+        provider = factory(model_name)
+        _providers[key] = provider
+        return provider
     except ImportError as e:
         logger.error(f"Failed to import provider {provider_name}: {e}")
         return None
@@ -65,53 +136,42 @@ def get_provider(provider_name: str = None):
         logger.error(f"Error initializing provider {provider_name}: {e}")
         return None
 
-async def get_available_models():
+# Providers probed by get_available_models: name -> (module, class, display name)
+_MODEL_PROBES = {
+    'claude': ('.claude_provider', 'ClaudeProvider', 'Claude'),
+    'openai': ('.openai_provider', 'OpenAIProvider', 'OpenAI'),
+    'deepseek': ('.deepseek_provider', 'DeepSeekProvider', 'DeepSeek'),
+    'ollama': ('.ollama_provider', 'OllamaProvider', 'Ollama')
+}
+
+async def _list_models(module_name: str, class_name: str, display_name: str) -> List[Any]:
     """
-    Get available models from all providers
+    List the models of one provider, returning an empty list on any error
     
+    Args:
+        module_name: Module path relative to this package
+        class_name: Name of the provider class in that module
+        display_name: Provider name used in log messages
+        
     Returns:
-        dict: Dictionary of models by provider
+        list: Models reported by the provider
     """
-    models = {}
-    
-    # Claude models
-    try:
-        from .claude_provider import ClaudeProvider
-        claude = ClaudeProvider()
-        claude_models = await claude.list_models()
-        models['claude'] = claude_models
-    except Exception as e:
-        logger.error(f"Error getting Claude models: {e}")
-        models['claude'] = []
-    
-    # OpenAI models
     try:
-        from .openai_provider import OpenAIProvider
-        openai = OpenAIProvider()
-        openai_models = await openai.list_models()
-        models['openai'] = openai_models
+        provider_class = getattr(importlib.import_module(module_name, __name__), class_name)
+        return await provider_class().list_models()
     except Exception as e:
-        logger.error(f"Error getting OpenAI models: {e}")
-        models['openai'] = []
-    
-    # DeepSeek models
-    try:
-        from .deepseek_provider import DeepSeekProvider
-        deepseek = DeepSeekProvider()
-        deepseek_models = await deepseek.list_models()
-        models['deepseek'] = deepseek_models
-    except Exception as e:
-        logger.error(f"Error getting DeepSeek models: {e}")
-        models['deepseek'] = []
+        logger.error(f"Error getting {display_name} models: {e}")
+        return []
+
+async def get_available_models():
+    """
+    Get available models from all providers
     
-    # Ollama models (local)
-    try:
-        from .ollama_provider import OllamaProvider
-        ollama = OllamaProvider()
-        ollama_models = await ollama.list_models()
-        models['ollama'] = ollama_models
-    except Exception as e:
-        logger.error(f"Error getting Ollama models: {e}")
-        models['ollama'] = []
+    The providers are queried concurrently, so this takes as long as the
+    slowest provider rather than the sum of all of them.
     
-    return models
\ No newline at end of file
+    Returns:
+        dict: Dictionary of models by provider
+    """
+    results = await asyncio.gather(*(_list_models(*probe) for probe in _MODEL_PROBES.values()))
+    return dict(zip(_MODEL_PROBES, results))
@@ -0,0 +1,124 @@
+"""
+Shared HTTP Client
+One pooled httpx.AsyncClient per event loop, shared by all providers
+"""
+
+import json
+import asyncio
+import weakref
+import logging
+import functools
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Headers for requests whose body is already encoded JSON
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+# Pool and timeout settings for the shared client
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 100
+REQUEST_TIMEOUT = 60.0
+CONNECT_TIMEOUT = 5.0
+
+# httpx pools are bound to the loop they were first used on, and app.py runs
+# one loop per worker thread, so keep one client per loop
+_clients = weakref.WeakKeyDictionary()
+
+
+def _http2_available() -> bool:
+    """Check whether the optional h2 package needed for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_shared_client():
+    """
+    Get the shared httpx.AsyncClient for the running event loop
+    
+    HTTP/2 is enabled when the h2 package is installed, so concurrent requests
+    to the same API are multiplexed over one connection.
+    
+    Returns:
+        httpx.AsyncClient bound to the current event loop
+    """
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        import httpx
+        
+        client = httpx.AsyncClient(
+            http2=_http2_available(),
+            timeout=httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+            )
+        )
+        _clients[loop] = client
+    return client
+
+
+@functools.lru_cache(maxsize=None)
+def request_timeout(read: float):
+    """
+    Get a per-request timeout that changes the read timeout but keeps the
+    shared client's connect timeout
+    
+    Passing a plain number as timeout applies it to connecting as well, so
+    an unreachable host would hold a request for the whole read budget.
+    The timeouts are built once per value and reused.
+    
+    Args:
+        read: Seconds allowed for reading, writing and waiting for the pool
+    
+    Returns:
+        httpx.Timeout for the request
+    """
+    import httpx
+    
+    return httpx.Timeout(read, connect=CONNECT_TIMEOUT)
+
+
+async def close_shared_client() -> None:
+    """Close the shared client for the running event loop, if one was created"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+def encode_json(payload) -> bytes:
+    """
+    Encode a request payload as JSON, with orjson when it is installed
+    
+    Args:
+        payload: JSON-serializable request payload
+    
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+def decode_json(content):
+    """
+    Decode a JSON response body or line, with orjson when it is installed
+    
+    Args:
+        content: JSON document as bytes or str
+    
+    Returns:
+        The decoded value
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
@@ -0,0 +1,68 @@
+"""
+Shared Tokenizers
+Hugging Face tokenizers for providers without a tokenizer API, loaded from local files
+"""
+
+import logging
+import functools
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def load_tokenizer(path: str):
+    """
+    Load a tokenizer from a local tokenizer.json once per process
+    
+    Only local files are read, never the Hugging Face hub, so loading can't
+    wait on the network. The optional tokenizers package is imported here,
+    so providers work without it and fall back to their estimates. A failed
+    load is cached as well, so it isn't retried on every count.
+    
+    Args:
+        path: Path to a tokenizer.json file
+    
+    Returns:
+        tokenizers.Tokenizer, or None if it can't be loaded
+    """
+    try:
+        from tokenizers import Tokenizer
+    except ImportError:
+        logger.warning("tokenizers is not installed, ignoring tokenizer %s", path)
+        return None
+    
+    try:
+        return Tokenizer.from_file(path)
+    except Exception as e:
+        logger.warning("Could not load tokenizer %s, using estimates: %s", path, e)
+        return None
+
+
+def count_tokens_with(tokenizer, text: str) -> int:
+    """
+    Count the tokens of a text without special tokens
+    
+    Args:
+        tokenizer: Loaded tokenizers.Tokenizer
+        text: The text to count tokens for
+    
+    Returns:
+        Integer representing the token count
+    """
+    return len(tokenizer.encode(text, add_special_tokens=False).ids)
+
+
+def count_tokens_batch_with(tokenizer, texts: List[str]) -> List[int]:
+    """
+    Count the tokens of several texts in one call, encoded in parallel by the
+    Rust library
+    
+    Args:
+        tokenizer: Loaded tokenizers.Tokenizer
+        texts: The texts to count tokens for
+    
+    Returns:
+        List of token counts, in the same order as the texts
+    """
+    return [len(encoding.ids) for encoding in tokenizer.encode_batch(texts, add_special_tokens=False)]
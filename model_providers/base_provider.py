@@ -3,15 +3,73 @@ Base Model Provider
 Abstract base class for all model providers
 """
 
+import asyncio
+import hashlib
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+# Tokens reserved for message framing when bounding max_tokens
+_PROMPT_OVERHEAD_TOKENS = 64
+
+# Upper bound on tokens per character (UTF-8 bytes per character), used to
+# skip token counting for prompts that clearly fit
+_MAX_TOKENS_PER_CHAR = 4
+
+
+def _fits_uncounted(prompt: str, system_prompt: Optional[str], max_tokens: int, window: int) -> bool:
+    """
+    Check whether a request fits even at the worst-case token density, so its
+    tokens don't need counting
+    
+    Args:
+        prompt: The user prompt to send to the model
+        system_prompt: System instructions for the model (optional)
+        max_tokens: Requested maximum number of tokens to generate
+        window: Tokens available for prompt and completion
+        
+    Returns:
+        bool: True if the request certainly fits
+    """
+    chars = len(prompt) + (len(system_prompt) if system_prompt else 0)
+    return chars * _MAX_TOKENS_PER_CHAR + max_tokens <= window
+
+
+class PromptTooLongError(ValueError):
+    """Raised when a prompt leaves no room for a completion in the context window"""
+
+
+class ProviderAPIError(Exception):
+    """Raised when a provider's HTTP API answers with an error status"""
+    
+    def __init__(self, message: str, status_code: int, body: str):
+        """
+        Initialize the error
+        
+        Args:
+            message: Error message
+            status_code: HTTP status code of the response
+            body: Response body
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
 
 
 class BaseModelProvider(ABC):
     """
     Abstract base class that defines the interface for all model providers
+    
+    Implementations import their SDK or HTTP client lazily, on first use,
+    so importing one provider doesn't load every vendor's dependencies.
     """
     
+    # Requests generate_many keeps in flight when no limit is given
+    max_concurrency = 10
+    
+    # Responses remembered by generate_cached, 0 disables the cache
+    response_cache_size = 1024
+    
     @abstractmethod
     async def generate_response(self, 
                                prompt: str, 
@@ -32,8 +90,130 @@ class BaseModelProvider(ABC):
         """
         pass
     
+    async def generate_cached(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: int = 4000) -> str:
+        """
+        Generate a response, reusing the result of an identical earlier request
+        
+        Requests match when model, prompts, temperature and max_tokens are
+        equal, so a sampled answer is returned again rather than re-sampled;
+        use generate_response where a fresh sample is needed. Error responses
+        are not cached.
+        
+        Args:
+            prompt: The user prompt to send to the model
+            system_prompt: System instructions for the model (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            String containing the model's response
+        """
+        if not self.response_cache_size:
+            return await self.generate_response(prompt, system_prompt, temperature, max_tokens)
+        
+        # Providers don't share an __init__, so the cache is created on first use
+        cache = getattr(self, "_response_cache", None)
+        if cache is None:
+            cache = self._response_cache = OrderedDict()
+        
+        # Keyed by a digest so cached prompts aren't kept alive
+        key = hashlib.blake2b(
+            repr((self.get_model_name(), system_prompt, prompt, temperature, max_tokens)).encode(),
+            digest_size=16
+        ).digest()
+        
+        response = cache.get(key)
+        if response is not None:
+            cache.move_to_end(key)
+            return response
+        
+        response = await self.generate_response(prompt, system_prompt, temperature, max_tokens)
+        if not response.startswith("Error:"):
+            if len(cache) >= self.response_cache_size:
+                cache.popitem(last=False)
+            cache[key] = response
+        return response
+    
+    async def stream_response(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: int = 4000) -> AsyncIterator[str]:
+        """
+        Generate a response from the model, yielding text as it arrives
+        
+        The default implementation yields the whole response from
+        generate_response at once; providers with a streaming API override it.
+        Joining the chunks gives the same text generate_response returns.
+        
+        Args:
+            prompt: The user prompt to send to the model
+            system_prompt: System instructions for the model (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Yields:
+            Chunks of the model's response text
+        """
+        yield await self.generate_response(prompt, system_prompt, temperature, max_tokens)
+    
+    async def generate_responses_batch(self,
+                                       prompts: List[str],
+                                       system_prompt: Optional[str] = None,
+                                       temperature: float = 0.7,
+                                       max_tokens: int = 4000) -> List[str]:
+        """
+        Generate responses for several prompts
+        
+        The default implementation issues the requests concurrently through
+        generate_many; providers with a native batch endpoint can override it.
+        
+        Args:
+            prompts: The user prompts to send to the model
+            system_prompt: System instructions shared by all prompts (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate per response
+            
+        Returns:
+            List of response strings, in the same order as the prompts
+        """
+        return await self.generate_many(prompts, system_prompt=system_prompt,
+                                        temperature=temperature, max_tokens=max_tokens)
+    
+    async def generate_many(self,
+                            prompts: List[str],
+                            max_concurrency: Optional[int] = None,
+                            system_prompt: Optional[str] = None,
+                            temperature: float = 0.7,
+                            max_tokens: int = 4000) -> List[str]:
+        """
+        Generate responses for several prompts with bounded concurrency
+        
+        Args:
+            prompts: The user prompts to send to the model
+            max_concurrency: Maximum number of requests in flight at once,
+                defaults to the provider's max_concurrency
+            system_prompt: System instructions shared by all prompts (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate per response
+            
+        Returns:
+            List of response strings, in the same order as the prompts
+        """
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+        
+        async def generate_one(prompt: str) -> str:
+            async with semaphore:
+                return await self.generate_response(prompt, system_prompt, temperature, max_tokens)
+        
+        return list(await asyncio.gather(*[generate_one(prompt) for prompt in prompts]))
+    
     @abstractmethod
-    async def extract_code(self, response: str) -> List[str]:
+    def extract_code(self, response: str) -> List[str]:
         """
         Extract code blocks from a model response
         
@@ -45,6 +225,22 @@ class BaseModelProvider(ABC):
         """
         pass
     
+    def extract_first_code_block(self, response: str) -> Optional[str]:
+        """
+        Extract only the first code block from a model response
+        
+        Providers that can scan blocks lazily override this to stop after
+        the first one.
+        
+        Args:
+            response: The full text response from the model
+            
+        Returns:
+            The first extracted code block, or None if there is none
+        """
+        code_blocks = self.extract_code(response)
+        return code_blocks[0] if code_blocks else None
+    
     @abstractmethod
     def get_model_name(self) -> str:
         """
@@ -87,3 +283,109 @@ class BaseModelProvider(ABC):
             Integer representing the token count
         """
         pass
+    
+    async def count_tokens_async(self, text: str) -> int:
+        """
+        Count the number of tokens in a text from async code
+        
+        The default calls count_tokens, which is local for most providers;
+        providers whose count makes a request override this so it doesn't
+        block the event loop.
+        
+        Args:
+            text: The text to count tokens for
+            
+        Returns:
+            Integer representing the token count
+        """
+        return self.count_tokens(text)
+    
+    def _bound_max_tokens(self, prompt: str, system_prompt: Optional[str], max_tokens: int) -> int:
+        """
+        Limit max_tokens to what the context window can hold after the prompt
+        
+        Args:
+            prompt: The user prompt to send to the model
+            system_prompt: System instructions for the model (optional)
+            max_tokens: Requested maximum number of tokens to generate
+            
+        Returns:
+            max_tokens, lowered if the prompt leaves less room than requested
+            
+        Raises:
+            PromptTooLongError: If the prompt leaves no room for a completion
+        """
+        window = self.get_context_window() - _PROMPT_OVERHEAD_TOKENS
+        if _fits_uncounted(prompt, system_prompt, max_tokens, window):
+            return max_tokens
+        
+        used = self.count_tokens(prompt)
+        if system_prompt:
+            used += self.count_tokens(system_prompt)
+        return self._limit_max_tokens(max_tokens, window - used)
+    
+    async def _bound_max_tokens_async(self, prompt: str, system_prompt: Optional[str], max_tokens: int) -> int:
+        """
+        Limit max_tokens like _bound_max_tokens, counting with count_tokens_async
+        
+        Args:
+            prompt: The user prompt to send to the model
+            system_prompt: System instructions for the model (optional)
+            max_tokens: Requested maximum number of tokens to generate
+            
+        Returns:
+            max_tokens, lowered if the prompt leaves less room than requested
+            
+        Raises:
+            PromptTooLongError: If the prompt leaves no room for a completion
+        """
+        window = self.get_context_window() - _PROMPT_OVERHEAD_TOKENS
+        if _fits_uncounted(prompt, system_prompt, max_tokens, window):
+            return max_tokens
+        
+        used = await self.count_tokens_async(prompt)
+        if system_prompt:
+            used += await self.count_tokens_async(system_prompt)
+        return self._limit_max_tokens(max_tokens, window - used)
+    
+    def _limit_max_tokens(self, max_tokens: int, available: int) -> int:
+        """
+        Lower max_tokens to the room left in the context window
+        
+        Args:
+            max_tokens: Requested maximum number of tokens to generate
+            available: Tokens left in the context window after the prompt
+            
+        Returns:
+            The smaller of max_tokens and available
+            
+        Raises:
+            PromptTooLongError: If no room is left
+        """
+        if available <= 0:
+            raise PromptTooLongError(
+                f"Prompt exceeds the maximum context length of {self.get_context_window()} tokens"
+            )
+        return min(max_tokens, available)
+    
+    def fits_context(self,
+                     prompt: str,
+                     max_tokens: int = 4000,
+                     system_prompt: Optional[str] = None,
+                     margin: int = 256) -> bool:
+        """
+        Check whether a request fits the model's context window before sending it
+        
+        Args:
+            prompt: The user prompt to send to the model
+            max_tokens: Maximum number of tokens to generate
+            system_prompt: System instructions for the model (optional)
+            margin: Extra tokens reserved for message framing and estimate error
+            
+        Returns:
+            bool: True if prompt, system prompt and completion fit the context window
+        """
+        used = self.count_tokens(prompt) + max_tokens + margin
+        if system_prompt:
+            used += self.count_tokens(system_prompt)
+        return used <= self.get_context_window()
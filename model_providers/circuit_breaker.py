@@ -0,0 +1,118 @@
+"""
+Circuit Breaker
+Per-provider circuit breakers so failing providers are skipped for a while
+"""
+
+import time
+import threading
+from typing import Dict
+
+# Consecutive failures before a provider's circuit opens
+DEFAULT_FAILURE_THRESHOLD = 5
+
+# Seconds an open circuit waits before letting a trial request through
+DEFAULT_COOLDOWN = 30.0
+
+
+class CircuitBreaker:
+    """
+    Tracks consecutive failures of a provider
+    
+    The circuit opens after failure_threshold consecutive failures. Once the
+    cooldown has passed it becomes half-open and lets a single trial request
+    through; a success closes it, a failure opens it for another cooldown.
+    A trial that reports neither within a cooldown is given up on, so the
+    next caller becomes the trial.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = DEFAULT_FAILURE_THRESHOLD, cooldown: float = DEFAULT_COOLDOWN):
+        """
+        Initialize a closed circuit breaker
+        
+        Args:
+            failure_threshold: Consecutive failures before the circuit opens
+            cooldown: Seconds to keep the circuit open
+        """
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.failure_count = 0
+        self.opened_at = 0.0
+        self._state = self.CLOSED
+        self._trial_in_flight = False
+        self._trial_started_at = 0.0
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self) -> str:
+        """Current state, moving from open to half-open once the cooldown has passed"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+            return self._state
+    
+    def allow_request(self) -> bool:
+        """
+        Check whether a request to the provider should be attempted
+        
+        Returns:
+            bool: False while the circuit is open, or while half-open with a
+                trial request already in flight
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self._state == self.OPEN and now - self.opened_at >= self.cooldown:
+                self._state = self.HALF_OPEN
+            
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                return False
+            
+            # Half-open: only one caller probes the provider at a time
+            if self._trial_in_flight and now - self._trial_started_at < self.cooldown:
+                return False
+            self._trial_in_flight = True
+            self._trial_started_at = now
+            return True
+    
+    def record_success(self) -> None:
+        """Record a successful request, closing the circuit"""
+        with self._lock:
+            self.failure_count = 0
+            self._state = self.CLOSED
+            self._trial_in_flight = False
+    
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit if the threshold is reached"""
+        with self._lock:
+            self.failure_count += 1
+            self._trial_in_flight = False
+            if self._state == self.HALF_OPEN or self.failure_count >= self.failure_threshold:
+                self._state = self.OPEN
+                self.opened_at = time.monotonic()
+
+
+# Circuit breakers keyed by provider name
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(provider_name: str) -> CircuitBreaker:
+    """
+    Get the circuit breaker for a provider, creating it on first use
+    
+    Args:
+        provider_name: Name of the provider (claude, openai, deepseek)
+    
+    Returns:
+        CircuitBreaker: Shared breaker for the provider
+    """
+    breaker = _breakers.get(provider_name)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(provider_name, CircuitBreaker())
+    return breaker
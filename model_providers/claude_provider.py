@@ -5,13 +5,73 @@ Implementation for Anthropic's Claude models
 
 import os
 import re
+import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+import hashlib
+import weakref
+import threading
+import functools
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Iterator, AsyncIterator
 
-import anthropic
-from anthropic import Anthropic
+from model_providers.base_provider import BaseModelProvider, PromptTooLongError
+from model_providers.rate_limiter import AsyncRateLimiter
+from model_providers.circuit_breaker import get_breaker
+from model_providers._http import get_shared_client, request_timeout
 
-from model_providers.base_provider import BaseModelProvider
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _anthropic():
+    """Import the Anthropic SDK on first use, so importing this module stays cheap"""
+    import anthropic
+    return anthropic
+
+
+# Code blocks with or without language specification
+_CODE_FENCE_RE = re.compile(r'```(?:\w+\n)?(.*?)```', re.DOTALL)
+
+# A line that, once stripped, starts with a definition or import keyword,
+# suggesting an unfenced response is code
+_CODE_HINT_RE = re.compile(r'^[^\S\n]*(?:def|class|import|from) [^\n]*\S', re.MULTILINE)
+
+# Generation can take much longer than the shared client's default timeout,
+# which the SDK would otherwise adopt in place of its own 600 second default
+_REQUEST_TIMEOUT = 600.0
+
+# Smaller batches are sent as concurrent requests rather than through the
+# Message Batches API, whose turnaround is much longer than a single call
+_BATCH_API_MIN_PROMPTS = 20
+
+# Seconds between Message Batches status checks
+_BATCH_POLL_INTERVAL = 10
+
+# Seconds to wait for a Message Batch before cancelling it; the API allows
+# batches up to 24 hours
+_BATCH_TIMEOUT = 3600.0
+
+# Texts shorter than this get a length-based token estimate instead of a
+# tokenizer call
+_SHORT_TEXT_LENGTH = 256
+
+# Maximum number of token counts remembered per provider
+_TOKEN_CACHE_SIZE = 4096
+
+# Context window sizes for different Claude models
+_CONTEXT_WINDOWS = MappingProxyType({
+    "claude-3-opus-20240229": 200000,
+    "claude-3-5-sonnet-20240620": 200000,
+    "claude-3-7-sonnet-20250219": 200000,
+    "claude-3-sonnet-20240229": 200000,
+    "claude-3-haiku-20240307": 200000,
+    "claude-3-5-haiku-20240620": 200000,
+    "claude-2.1": 200000,
+    "claude-2.0": 100000,
+    "claude-instant-1.2": 100000,
+    # Add more models as they become available
+})
 
 
 class ClaudeProvider(BaseModelProvider):
@@ -19,6 +79,9 @@ class ClaudeProvider(BaseModelProvider):
     Provider implementation for Anthropic's Claude models
     """
     
+    # Seconds generate_responses_batch waits for a Message Batch to finish
+    batch_timeout = _BATCH_TIMEOUT
+    
     def __init__(self, api_key: str = None, model: str = "claude-3-7-sonnet-20250219"):
         """
         Initialize the Claude provider
@@ -32,7 +95,80 @@ class ClaudeProvider(BaseModelProvider):
             raise ValueError("Anthropic API key is required")
         
         self.model = model
-        self.client = Anthropic(api_key=self.api_key)
+        self.client = _anthropic().Anthropic(api_key=self.api_key)
+        
+        # Async clients use the shared HTTP client of the event loop they were
+        # created on, so keep one per loop (app.py runs a loop per worker
+        # thread while providers are shared)
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._token_cache = OrderedDict()
+        
+        # count_tokens_async counts on worker threads, which share the cache
+        self._token_cache_lock = threading.Lock()
+        
+        # Optional account limits, so concurrent callers don't run into 429s
+        self._limiter = AsyncRateLimiter(
+            requests_per_minute=float(os.environ.get("ANTHROPIC_RPM", 0)) or None,
+            tokens_per_minute=float(os.environ.get("ANTHROPIC_TPM", 0)) or None
+        )
+    
+    def _get_async_client(self) -> "anthropic.AsyncAnthropic":
+        """
+        Get the async client for the running event loop, creating it on first use
+        
+        Returns:
+            AsyncAnthropic client bound to the current event loop
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed():
+            client = _anthropic().AsyncAnthropic(
+                api_key=self.api_key,
+                http_client=get_shared_client(),
+                timeout=request_timeout(_REQUEST_TIMEOUT)
+            )
+            self._async_clients[loop] = client
+        return client
+    
+    async def close(self) -> None:
+        """
+        Drop the async client for the running event loop
+        
+        Its connections belong to the shared HTTP client, which is closed with
+        model_providers._http.close_shared_client().
+        """
+        self._async_clients.pop(asyncio.get_running_loop(), None)
+    
+    def _build_params(self,
+                      prompt: str,
+                      system_prompt: Optional[str],
+                      temperature: float,
+                      max_tokens: int) -> Dict[str, Any]:
+        """
+        Build the Messages API parameters for a single prompt
+        
+        Args:
+            prompt: The user prompt to send to Claude
+            system_prompt: System instructions for Claude (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            Dictionary of request parameters
+        """
+        params = {
+            "model": self.model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
+        }
+        
+        if system_prompt:
+            params["system"] = system_prompt
+        
+        return params
         
     async def generate_response(self, 
                                prompt: str, 
@@ -51,55 +187,203 @@ class ClaudeProvider(BaseModelProvider):
         Returns:
             String containing Claude's response
         """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return ""
+        
         try:
-            # Use the appropriate parameters for Claude
-            params = {
-                "model": self.model,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-                "messages": [
-                    {"role": "user", "content": prompt}
-                ]
-            }
-            
-            if system_prompt:
-                params["system"] = system_prompt
-                
-            # Run in an asyncio event loop
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.messages.create(**params)
-            )
+            max_tokens = await self._bound_max_tokens_async(prompt, system_prompt, max_tokens)
+            params = self._build_params(prompt, system_prompt, temperature, max_tokens)
             
+            # Token cost is only needed when a tokens-per-minute limit is set
+            cost = await self.count_tokens_async(prompt) + max_tokens if self._limiter.limits_tokens else 0
+            
+            # Native async request, no executor thread hand-off
+            async with self._limiter.acquire(cost=cost):
+                response = await self._get_async_client().messages.create(**params)
+            
+            get_breaker("claude").record_success()
             return response.content[0].text
             
+        except PromptTooLongError as e:
+            # Rejected before sending, so not a provider failure
+            logger.error("Error generating response from Claude: %s", e)
+            return f"Error: {str(e)}"
+            
         except Exception as e:
-            print(f"Error generating response from Claude: {e}")
+            get_breaker("claude").record_failure()
+            logger.error("Error generating response from Claude: %s", e)
             return f"Error: {str(e)}"
     
-    async def extract_code(self, response: str) -> List[str]:
+    async def stream_response(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: int = 4000) -> AsyncIterator[str]:
         """
-        Extract code blocks from Claude's response
+        Generate a response from Claude, yielding text as it arrives
         
         Args:
-            response: The full text response from Claude
+            prompt: The user prompt to send to Claude
+            system_prompt: System instructions for Claude (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Yields:
+            Chunks of Claude's response text
+        """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return
+        
+        try:
+            max_tokens = await self._bound_max_tokens_async(prompt, system_prompt, max_tokens)
+            params = self._build_params(prompt, system_prompt, temperature, max_tokens)
+            cost = await self.count_tokens_async(prompt) + max_tokens if self._limiter.limits_tokens else 0
+            
+            async with self._limiter.acquire(cost=cost):
+                async with self._get_async_client().messages.stream(**params) as stream:
+                    async for text in stream.text_stream:
+                        yield text
+            
+            get_breaker("claude").record_success()
+            
+        except PromptTooLongError as e:
+            # Rejected before sending, so not a provider failure
+            logger.error("Error streaming response from Claude: %s", e)
+            yield f"Error: {str(e)}"
+            
+        except Exception as e:
+            get_breaker("claude").record_failure()
+            logger.error("Error streaming response from Claude: %s", e)
+            yield f"Error: {str(e)}"
+    
+    async def generate_responses_batch(self,
+                                       prompts: List[str],
+                                       system_prompt: Optional[str] = None,
+                                       temperature: float = 0.7,
+                                       max_tokens: int = 4000) -> List[str]:
+        """
+        Generate responses for several prompts via the Message Batches API
+        
+        Batches are billed at a discount but can take a while to complete, so
+        fewer than _BATCH_API_MIN_PROMPTS prompts are sent as concurrent
+        regular requests instead. Empty prompts are not sent and get "", and
+        a batch still running after batch_timeout seconds is cancelled.
+        
+        Args:
+            prompts: The user prompts to send to Claude
+            system_prompt: System instructions shared by all prompts (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate per response
             
         Returns:
-            List of extracted code blocks
+            List of response strings, in the same order as the prompts
         """
-        # Pattern to match code blocks with or without language specification
-        pattern = r'```(?:\w+\n)?(.*?)```'
-        matches = re.findall(pattern, response, re.DOTALL)
+        if len(prompts) < _BATCH_API_MIN_PROMPTS:
+            return await super().generate_responses_batch(prompts, system_prompt, temperature, max_tokens)
+        
+        responses = [None] * len(prompts)
+        
+        try:
+            requests = []
+            for i, prompt in enumerate(prompts):
+                # Same checks as generate_response, so nothing is billed for
+                # prompts that can't produce a response
+                if not prompt or prompt.isspace():
+                    responses[i] = ""
+                    continue
+                
+                try:
+                    prompt_max_tokens = await self._bound_max_tokens_async(prompt, system_prompt, max_tokens)
+                except PromptTooLongError as e:
+                    responses[i] = f"Error: {str(e)}"
+                    continue
+                
+                params = self._build_params(prompt, system_prompt, temperature, prompt_max_tokens)
+                requests.append({"custom_id": f"r{i}", "params": params})
+            
+            if not requests:
+                return responses
+            
+            client = self._get_async_client()
+            batch = await client.messages.batches.create(requests=requests)
+            
+            # Poll until every request in the batch has finished
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + self.batch_timeout
+            while batch.processing_status != "ended":
+                if loop.time() >= deadline:
+                    await client.messages.batches.cancel(batch.id)
+                    raise TimeoutError(f"Batch {batch.id} did not finish within {self.batch_timeout} seconds")
+                
+                await asyncio.sleep(_BATCH_POLL_INTERVAL)
+                batch = await client.messages.batches.retrieve(batch.id)
+            
+            # Results are not guaranteed to come back in request order
+            async for entry in await client.messages.batches.results(batch.id):
+                index = int(entry.custom_id[1:])
+                if entry.result.type == "succeeded":
+                    responses[index] = entry.result.message.content[0].text
+                else:
+                    responses[index] = f"Error: batch request {entry.result.type}"
+            
+            return [response if response is not None else "Error: missing batch result"
+                    for response in responses]
+            
+        except Exception as e:
+            logger.error("Error generating batch responses from Claude: %s", e)
+            # Prompts answered without the batch keep their response
+            return [response if response is not None else f"Error: {str(e)}"
+                    for response in responses]
+    
+    def iter_code_blocks(self, response: str) -> Iterator[str]:
+        """
+        Yield code blocks from Claude's response one at a time
+        
+        Args:
+            response: The full text response from Claude
+            
+        Yields:
+            Extracted code blocks, in order
+        """
+        found = False
+        
+        # Skip the regex entirely when there is no code fence
+        if '```' in response:
+            for match in _CODE_FENCE_RE.finditer(response):
+                found = True
+                yield match.group(1)
         
         # If no matches found, check if the entire response might be code
-        if not matches and not response.startswith('```') and not response.endswith('```'):
+        if not found and not response.startswith('```') and not response.endswith('```'):
             # Heuristic: If response has multiple lines and looks like code
-            lines = response.split('\n')
-            if len(lines) > 1 and any(line.strip().startswith(('def ', 'class ', 'import ', 'from ')) for line in lines):
-                return [response]
+            if '\n' in response and _CODE_HINT_RE.search(response):
+                yield response
+    
+    def extract_code(self, response: str) -> List[str]:
+        """
+        Extract code blocks from Claude's response
         
-        return matches
+        Args:
+            response: The full text response from Claude
+            
+        Returns:
+            List of extracted code blocks
+        """
+        return list(self.iter_code_blocks(response))
+    
+    def extract_first_code_block(self, response: str) -> Optional[str]:
+        """
+        Extract only the first code block from Claude's response
+        
+        Args:
+            response: The full text response from Claude
+            
+        Returns:
+            The first extracted code block, or None if there is none
+        """
+        return next(self.iter_code_blocks(response), None)
     
     def get_model_name(self) -> str:
         """Get the name of the currently used Claude model"""
@@ -116,35 +400,58 @@ class ClaudeProvider(BaseModelProvider):
         Returns:
             Integer representing the context window size
         """
-        # Context window sizes for different Claude models
-        context_windows = {
-            "claude-3-opus-20240229": 200000,
-            "claude-3-5-sonnet-20240620": 200000,
-            "claude-3-7-sonnet-20250219": 200000,
-            "claude-3-sonnet-20240229": 200000,
-            "claude-3-haiku-20240307": 200000,
-            "claude-3-5-haiku-20240620": 200000,
-            "claude-2.1": 200000,
-            "claude-2.0": 100000,
-            "claude-instant-1.2": 100000,
-            # Add more models as they become available
-        }
-        
-        return context_windows.get(self.model, 100000)  # Default to 100K
+        return _CONTEXT_WINDOWS.get(self.model, 100000)  # Default to 100K
     
     def count_tokens(self, text: str) -> int:
         """
         Count the number of tokens in a text using Claude's tokenizer
         
+        Uncached texts are counted with a blocking call; async code uses
+        count_tokens_async instead.
+        
         Args:
             text: The text to count tokens for
             
         Returns:
             Integer representing the token count
         """
+        # Short strings only matter for overflow checks, where an estimate will do
+        if len(text) < _SHORT_TEXT_LENGTH:
+            return max(1, len(text) // 4) if text else 0
+        
+        # Keyed by a digest so cached prompts aren't kept alive
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        with self._token_cache_lock:
+            count = self._token_cache.get(key)
+            if count is not None:
+                self._token_cache.move_to_end(key)
+                return count
+        
         try:
-            return self.client.count_tokens(text)
+            count = self.client.count_tokens(text)
         except Exception as e:
-            print(f"Error counting tokens: {e}")
+            logger.error("Error counting tokens: %s", e)
             # Fallback to rough estimate
-            return len(text.split()) * 1.3  # Rough estimate
+            return int(len(text.split()) * 1.3)  # Rough estimate
+        
+        with self._token_cache_lock:
+            if len(self._token_cache) >= _TOKEN_CACHE_SIZE:
+                self._token_cache.popitem(last=False)
+            self._token_cache[key] = count
+        return count
+    
+    async def count_tokens_async(self, text: str) -> int:
+        """
+        Count the number of tokens in a text without blocking the event loop
+        
+        Args:
+            text: The text to count tokens for
+            
+        Returns:
+            Integer representing the token count
+        """
+        # Short texts are estimated locally, with nothing to wait for
+        if len(text) < _SHORT_TEXT_LENGTH:
+            return self.count_tokens(text)
+        
+        return await asyncio.to_thread(self.count_tokens, text)
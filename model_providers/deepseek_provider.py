@@ -5,12 +5,52 @@ Implementation for DeepSeek models
 
 import os
 import re
+import logging
 import json
 import asyncio
-import aiohttp
-from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, AsyncIterator
 
-from model_providers.base_provider import BaseModelProvider
+from model_providers.base_provider import BaseModelProvider, PromptTooLongError, ProviderAPIError
+from model_providers.circuit_breaker import get_breaker
+from model_providers._http import get_shared_client, request_timeout, encode_json, decode_json
+from model_providers._tokenizers import load_tokenizer, count_tokens_with, count_tokens_batch_with
+
+logger = logging.getLogger(__name__)
+
+# Generation can take much longer than the shared client's default timeout
+_REQUEST_TIMEOUT = 600.0
+
+# Code blocks with or without language specification
+_CODE_FENCE_RE = re.compile(r'```(?:\w+\n)?(.*?)```', re.DOTALL)
+
+# A line that, once stripped, starts with a definition or import keyword,
+# suggesting an unfenced response is code
+_CODE_HINT_RE = re.compile(r'^[^\S\n]*(?:def|class|import|from) [^\n]*\S', re.MULTILINE)
+
+# Context window sizes for different DeepSeek models
+_CONTEXT_WINDOWS = MappingProxyType({
+    "deepseek-coder": 32768,
+    "deepseek-chat": 16384,
+    # Add more models as they become available
+})
+
+
+class DeepSeekAPIError(ProviderAPIError):
+    """Raised when the DeepSeek API answers with an error status"""
+    
+    @classmethod
+    def from_response(cls, response) -> "DeepSeekAPIError":
+        """
+        Build the error from an httpx response whose body has been read
+        
+        Args:
+            response: Error response
+            
+        Returns:
+            DeepSeekAPIError carrying the status code and body
+        """
+        return cls(f"API Error: {response.status_code} - {response.text}", response.status_code, response.text)
 
 
 class DeepSeekProvider(BaseModelProvider):
@@ -18,13 +58,15 @@ class DeepSeekProvider(BaseModelProvider):
     Provider implementation for DeepSeek models
     """
     
-    def __init__(self, api_key: str = None, model: str = "deepseek-coder"):
+    def __init__(self, api_key: str = None, model: str = "deepseek-coder", tokenizer_path: str = None):
         """
         Initialize the DeepSeek provider
         
         Args:
             api_key: DeepSeek API key, defaults to environment variable
             model: DeepSeek model to use
+            tokenizer_path: Local tokenizer.json of the hosted models for exact
+                token counts, defaults to environment variable
         """
         self.api_key = api_key or os.environ.get("DEEPSEEK_API_KEY")
         if not self.api_key:
@@ -33,6 +75,49 @@ class DeepSeekProvider(BaseModelProvider):
         self.model = model
         self.api_url = "https://api.deepseek.com/v1/chat/completions"
         
+        # Fixed for the provider's lifetime, so built once
+        self._headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        
+        # Loaded here rather than on first count, which can happen on an event loop
+        tokenizer_path = tokenizer_path or os.environ.get("DEEPSEEK_TOKENIZER_PATH")
+        self._tokenizer = load_tokenizer(tokenizer_path) if tokenizer_path else None
+    
+    def _build_payload(self,
+                       prompt: str,
+                       system_prompt: Optional[str],
+                       temperature: float,
+                       max_tokens: int) -> Dict[str, Any]:
+        """
+        Build the chat completions payload for a single prompt
+        
+        Args:
+            prompt: The user prompt to send to DeepSeek
+            system_prompt: System instructions for DeepSeek (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            Dictionary with the request payload
+        """
+        messages = []
+        
+        # Add system message if provided
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+            
+        # Add user message
+        messages.append({"role": "user", "content": prompt})
+        
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+        
     async def generate_response(self, 
                                prompt: str, 
                                system_prompt: Optional[str] = None,
@@ -50,43 +135,97 @@ class DeepSeekProvider(BaseModelProvider):
         Returns:
             String containing DeepSeek's response
         """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return ""
+        
+        try:
+            max_tokens = self._bound_max_tokens(prompt, system_prompt, max_tokens)
+            payload = self._build_payload(prompt, system_prompt, temperature, max_tokens)
+            
+            # Pooled connections shared with the other providers on this loop
+            response = await get_shared_client().post(
+                self.api_url, headers=self._headers, content=encode_json(payload),
+                timeout=request_timeout(_REQUEST_TIMEOUT)
+            )
+            if response.status_code != 200:
+                raise DeepSeekAPIError.from_response(response)
+            
+            content = decode_json(response.content)["choices"][0]["message"]["content"]
+            
+            get_breaker("deepseek").record_success()
+            return content
+            
+        except PromptTooLongError as e:
+            # Rejected before sending, so not a provider failure
+            logger.error("Error generating response from DeepSeek: %s", e)
+            return f"Error: {str(e)}"
+            
+        except Exception as e:
+            get_breaker("deepseek").record_failure()
+            logger.error("Error generating response from DeepSeek: %s", e)
+            return f"Error: {str(e)}"
+    
+    async def stream_response(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: int = 4000) -> AsyncIterator[str]:
+        """
+        Generate a response from DeepSeek, yielding text as it arrives
+        
+        Args:
+            prompt: The user prompt to send to DeepSeek
+            system_prompt: System instructions for DeepSeek (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Yields:
+            Chunks of DeepSeek's response text
+        """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return
+        
         try:
-            messages = []
+            max_tokens = self._bound_max_tokens(prompt, system_prompt, max_tokens)
+            payload = self._build_payload(prompt, system_prompt, temperature, max_tokens)
+            payload["stream"] = True
             
-            # Add system message if provided
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
+            async with get_shared_client().stream(
+                "POST", self.api_url, headers=self._headers, content=encode_json(payload),
+                timeout=request_timeout(_REQUEST_TIMEOUT)
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise DeepSeekAPIError.from_response(response)
                 
-            # Add user message
-            messages.append({"role": "user", "content": prompt})
-            
-            # Prepare the request payload
-            payload = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            }
-            
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.api_key}"
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(self.api_url, headers=headers, json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"API Error: {response.status} - {error_text}")
+                # Server-sent events, one "data: {json}" line per delta
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
                     
-                    result = await response.json()
-                    return result["choices"][0]["message"]["content"]
+                    content = decode_json(data)["choices"][0]["delta"].get("content")
+                    if content:
+                        yield content
+            
+            get_breaker("deepseek").record_success()
+            
+        except PromptTooLongError as e:
+            # Rejected before sending, so not a provider failure
+            logger.error("Error streaming response from DeepSeek: %s", e)
+            yield f"Error: {str(e)}"
             
         except Exception as e:
-            print(f"Error generating response from DeepSeek: {e}")
-            return f"Error: {str(e)}"
+            get_breaker("deepseek").record_failure()
+            logger.error("Error streaming response from DeepSeek: %s", e)
+            yield f"Error: {str(e)}"
     
-    async def extract_code(self, response: str) -> List[str]:
+    def extract_code(self, response: str) -> List[str]:
         """
         Extract code blocks from DeepSeek's response
         
@@ -96,15 +235,13 @@ class DeepSeekProvider(BaseModelProvider):
         Returns:
             List of extracted code blocks
         """
-        # Pattern to match code blocks with or without language specification
-        pattern = r'```(?:\w+\n)?(.*?)```'
-        matches = re.findall(pattern, response, re.DOTALL)
+        # Skip the regex entirely when there is no code fence
+        matches = _CODE_FENCE_RE.findall(response) if '```' in response else []
         
         # If no matches found, check if the entire response might be code
         if not matches and not response.startswith('```') and not response.endswith('```'):
             # Heuristic: If response has multiple lines and looks like code
-            lines = response.split('\n')
-            if len(lines) > 1 and any(line.strip().startswith(('def ', 'class ', 'import ', 'from ')) for line in lines):
+            if '\n' in response and _CODE_HINT_RE.search(response):
                 return [response]
         
         return matches
@@ -124,14 +261,7 @@ class DeepSeekProvider(BaseModelProvider):
         Returns:
             Integer representing the context window size
         """
-        # Context window sizes for different DeepSeek models
-        context_windows = {
-            "deepseek-coder": 32768,
-            "deepseek-chat": 16384,
-            # Add more models as they become available
-        }
-        
-        return context_windows.get(self.model, 16384)  # Default to 16K
+        return _CONTEXT_WINDOWS.get(self.model, 16384)  # Default to 16K
     
     def count_tokens(self, text: str) -> int:
         """
@@ -143,5 +273,23 @@ class DeepSeekProvider(BaseModelProvider):
         Returns:
             Integer representing the token count
         """
-        # DeepSeek doesn't have a public tokenizer, so we use a rough estimate
-        return len(text.split()) * 1.3  # Rough estimate based on typical tokenization
+        # Native (Rust) tokenizer when one is configured
+        if self._tokenizer is not None:
+            return count_tokens_with(self._tokenizer, text)
+        
+        return int(len(text.split()) * 1.3)  # Rough estimate based on typical tokenization
+    
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        Count the number of tokens in several texts at once
+        
+        Args:
+            texts: The texts to count tokens for
+        
+        Returns:
+            List of token counts, in the same order as the texts
+        """
+        if self._tokenizer is not None:
+            return count_tokens_batch_with(self._tokenizer, texts)
+        
+        return [self.count_tokens(text) for text in texts]
@@ -6,22 +6,76 @@ Implementation for locally hosted models via Ollama
 import os
 import re
 import json
-import aiohttp
 import asyncio
-from typing import Dict, List, Any, Optional, Tuple, Union
+from types import MappingProxyType
+from typing import Dict, List, Any, Optional, Tuple, Union, AsyncIterator
 import logging
 
-from model_providers.base_provider import BaseModelProvider
+from model_providers.base_provider import BaseModelProvider, ProviderAPIError
+from model_providers._http import get_shared_client, request_timeout, encode_json, decode_json, JSON_HEADERS
+from model_providers._tokenizers import load_tokenizer, count_tokens_with, count_tokens_batch_with
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# Local generation can take much longer than the shared client's default timeout
+_REQUEST_TIMEOUT = 600.0
+
+# Listing a server's models should be quick; a server that can't answer in
+# time is reported unavailable
+_PROBE_TIMEOUT = 5.0
+
+# Requests an Ollama server processes in parallel per model unless
+# OLLAMA_NUM_PARALLEL is set; more than that just queue on the server
+_DEFAULT_NUM_PARALLEL = 4
+
+# Code blocks with or without language specification
+_CODE_FENCE_RE = re.compile(r'```(?:\w+\n)?(.*?)```', re.DOTALL)
+
+# A line that, once stripped, starts with a definition or import keyword,
+# suggesting an unfenced response is code
+_CODE_HINT_RE = re.compile(r'^[^\S\n]*(?:def|class|import|from) [^\n]*\S', re.MULTILINE)
+
+# Context window sizes for different local models
+_CONTEXT_WINDOWS = MappingProxyType({
+    "codellama:34b": 16384,
+    "codellama:13b": 16384,
+    "codellama:7b": 16384,
+    "llama2:70b": 4096,
+    "llama2:13b": 4096,
+    "llama2:7b": 4096,
+    "wizardcoder:15b": 8192,
+    "wizardlm:30b": 4096,
+    "mpt:30b": 8192,
+    "mpt:7b": 8192,
+    "vicuna:13b": 4096,
+    "wizard-coder:python": 16384,
+    "starcoder": 16384
+})
+
+class OllamaAPIError(ProviderAPIError):
+    """Raised when the Ollama API answers with an error status"""
+    
+    @classmethod
+    def from_response(cls, response) -> "OllamaAPIError":
+        """
+        Build the error from an httpx response whose body has been read
+        
+        Args:
+            response: Error response
+            
+        Returns:
+            OllamaAPIError carrying the status code and body
+        """
+        return cls(f"Ollama API error: {response.status_code} - {response.text}", response.status_code, response.text)
+
 class OllamaProvider(BaseModelProvider):
     """
     Provider implementation for locally hosted models via Ollama
     """
     
-    def __init__(self, api_url: str = None, model: str = "codellama:34b", server_id: str = None):
+    def __init__(self, api_url: str = None, model: str = "codellama:34b", server_id: str = None,
+                 tokenizer_path: str = None):
         """
         Initialize the Ollama provider
         
@@ -29,6 +83,8 @@ class OllamaProvider(BaseModelProvider):
             api_url: Base URL for the Ollama API, defaults to environment variable
             model: Ollama model to use
             server_id: Identifier for the server running this model
+            tokenizer_path: Local tokenizer.json of the model's family for exact
+                token counts, defaults to environment variable
         """
         self.api_url = api_url or os.environ.get("OLLAMA_API_URL", "http://localhost:11434")
         self.model = model
@@ -42,7 +98,78 @@ class OllamaProvider(BaseModelProvider):
         if not self.api_url.startswith(('http://', 'https://')):
             raise ValueError(f"Invalid Ollama API URL: {self.api_url}")
         
-        logger.info(f"Initialized Ollama provider with model {model} on server {server_id} at {self.api_url}")
+        # Match generate_many's concurrency to the server's parallelism
+        self.max_concurrency = self._num_parallel()
+        
+        # Loaded here rather than on first count, which can happen on an event
+        # loop, and only used while the model stays in the same family
+        tokenizer_path = tokenizer_path or os.environ.get("OLLAMA_TOKENIZER_PATH")
+        self._tokenizer = load_tokenizer(tokenizer_path) if tokenizer_path else None
+        self._tokenizer_family = self._model_family()
+        
+        logger.info("Initialized Ollama provider with model %s on server %s at %s", model, server_id, self.api_url)
+    
+    @staticmethod
+    def _num_parallel() -> int:
+        """
+        Read the server's parallelism from OLLAMA_NUM_PARALLEL
+        
+        It is only a tuning hint, so an unusable value falls back to the
+        default instead of failing provider construction.
+        
+        Returns:
+            Integer of at least 1
+        """
+        value = os.environ.get("OLLAMA_NUM_PARALLEL")
+        if not value:
+            return _DEFAULT_NUM_PARALLEL
+        
+        try:
+            return max(1, int(value))
+        except ValueError:
+            logger.warning("Ignoring invalid OLLAMA_NUM_PARALLEL %r, using %d", value, _DEFAULT_NUM_PARALLEL)
+            return _DEFAULT_NUM_PARALLEL
+    
+    def _build_payload(self,
+                       prompt: str,
+                       system_prompt: Optional[str],
+                       temperature: float,
+                       max_tokens: int,
+                       stream: bool) -> Dict[str, Any]:
+        """
+        Build the /api/generate payload for a single prompt
+        
+        Args:
+            prompt: The user prompt to send to the model
+            system_prompt: System instructions for the model (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            stream: Whether the server should stream the response
+            
+        Returns:
+            Dictionary with the request payload
+        """
+        # Construct the payload
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "temperature": temperature,
+            "num_predict": max_tokens,
+            "stream": stream
+        }
+        
+        # Add system prompt if provided
+        if system_prompt:
+            # Different models may have different formats for system prompts
+            # For Llama models, we use this format
+            if "llama" in self.model.lower():
+                full_prompt = f"<s>[INST] <<SYS>>\n{system_prompt}\n<</SYS>>\n\n{prompt} [/INST]"
+                payload["prompt"] = full_prompt
+            else:
+                # For models that support system as a separate field
+                payload["system"] = system_prompt
+        
+        return payload
     
     async def generate_response(self, 
                               prompt: str, 
@@ -61,42 +188,77 @@ class OllamaProvider(BaseModelProvider):
         Returns:
             String containing the model's response
         """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return ""
+        
         try:
-            # Construct the payload
-            payload = {
-                "model": self.model,
-                "prompt": prompt,
-                "temperature": temperature,
-                "num_predict": max_tokens,
-                "stream": False
-            }
-            
-            # Add system prompt if provided
-            if system_prompt:
-                # Different models may have different formats for system prompts
-                # For Llama models, we use this format
-                if "llama" in self.model.lower():
-                    full_prompt = f"<s>[INST] <<SYS>>\n{system_prompt}\n<</SYS>>\n\n{prompt} [/INST]"
-                    payload["prompt"] = full_prompt
-                else:
-                    # For models that support system as a separate field
-                    payload["system"] = system_prompt
+            max_tokens = self._bound_max_tokens(prompt, system_prompt, max_tokens)
+            payload = self._build_payload(prompt, system_prompt, temperature, max_tokens, stream=False)
             
             # Make the request
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{self.api_url}/api/generate", json=payload) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        raise Exception(f"Ollama API error: {response.status} - {error_text}")
-                    
-                    result = await response.json()
-                    return result.get("response", "")
+            response = await get_shared_client().post(
+                f"{self.api_url}/api/generate", headers=JSON_HEADERS, content=encode_json(payload),
+                timeout=request_timeout(_REQUEST_TIMEOUT)
+            )
+            if response.status_code != 200:
+                raise OllamaAPIError.from_response(response)
+            
+            return decode_json(response.content).get("response", "")
         
         except Exception as e:
-            logger.error(f"Error generating response from Ollama model: {e}")
+            logger.error("Error generating response from Ollama model: %s", e)
             return f"Error: {str(e)}"
     
-    async def extract_code(self, response: str) -> List[str]:
+    async def stream_response(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: int = 4000) -> AsyncIterator[str]:
+        """
+        Generate a response from a local Ollama model, yielding text as it arrives
+        
+        Args:
+            prompt: The user prompt to send to the model
+            system_prompt: System instructions for the model (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Yields:
+            Chunks of the model's response text
+        """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return
+        
+        try:
+            max_tokens = self._bound_max_tokens(prompt, system_prompt, max_tokens)
+            payload = self._build_payload(prompt, system_prompt, temperature, max_tokens, stream=True)
+            
+            async with get_shared_client().stream(
+                "POST", f"{self.api_url}/api/generate", headers=JSON_HEADERS, content=encode_json(payload),
+                timeout=request_timeout(_REQUEST_TIMEOUT)
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise OllamaAPIError.from_response(response)
+                
+                # Newline-delimited JSON, one object per generated chunk
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    
+                    chunk = decode_json(line)
+                    if chunk.get("response"):
+                        yield chunk["response"]
+                    if chunk.get("done"):
+                        break
+        
+        except Exception as e:
+            logger.error("Error streaming response from Ollama model: %s", e)
+            yield f"Error: {str(e)}"
+    
+    def extract_code(self, response: str) -> List[str]:
         """
         Extract code blocks from model's response
         
@@ -106,15 +268,13 @@ class OllamaProvider(BaseModelProvider):
         Returns:
             List of extracted code blocks
         """
-        # Pattern to match code blocks with or without language specification
-        pattern = r'```(?:\w+\n)?(.*?)```'
-        matches = re.findall(pattern, response, re.DOTALL)
+        # Skip the regex entirely when there is no code fence
+        matches = _CODE_FENCE_RE.findall(response) if '```' in response else []
         
         # If no matches found, check if the entire response might be code
         if not matches and not response.startswith('```') and not response.endswith('```'):
             # Heuristic: If response has multiple lines and looks like code
-            lines = response.split('\n')
-            if len(lines) > 1 and any(line.strip().startswith(('def ', 'class ', 'import ', 'from ')) for line in lines):
+            if '\n' in response and _CODE_HINT_RE.search(response):
                 return [response]
         
         return matches
@@ -134,28 +294,12 @@ class OllamaProvider(BaseModelProvider):
         Returns:
             Integer representing the context window size
         """
-        # Context window sizes for different local models
-        context_windows = {
-            "codellama:34b": 16384,
-            "codellama:13b": 16384,
-            "codellama:7b": 16384,
-            "llama2:70b": 4096,
-            "llama2:13b": 4096,
-            "llama2:7b": 4096,
-            "wizardcoder:15b": 8192,
-            "wizardlm:30b": 4096,
-            "mpt:30b": 8192,
-            "mpt:7b": 8192,
-            "vicuna:13b": 4096,
-            "wizard-coder:python": 16384,
-            "starcoder": 16384
-        }
-        
-        # Extract the base model name before any customization tags
-        base_model = self.model.split(':')[0].lower() + ":" + self.model.split(':')[1].lower() if ":" in self.model else self.model.lower()
+        # Extract the base model name before any customization tags, i.e.
+        # keep at most "name:tag"
+        base_model = ":".join(self.model.lower().split(":", 2)[:2])
         
         # Return the context window size or a default value
-        return context_windows.get(base_model, 4096)
+        return _CONTEXT_WINDOWS.get(base_model, 4096)
     
     def count_tokens(self, text: str) -> int:
         """
@@ -167,11 +311,48 @@ class OllamaProvider(BaseModelProvider):
         Returns:
             Integer representing the token count
         """
+        # Native (Rust) tokenizer when one is configured for this model's family
+        tokenizer = self._get_tokenizer()
+        if tokenizer is not None:
+            return count_tokens_with(tokenizer, text)
+        
         # Simple estimation based on whitespace tokenization
-        # For more accurate counts, you'd need model-specific tokenizers
         words = len(text.split())
         return int(words * 1.3)  # Rough estimate (1.3 tokens per word)
     
+    def count_tokens_batch(self, texts: List[str]) -> List[int]:
+        """
+        Count the number of tokens in several texts at once
+        
+        Args:
+            texts: The texts to count tokens for
+        
+        Returns:
+            List of token counts, in the same order as the texts
+        """
+        tokenizer = self._get_tokenizer()
+        if tokenizer is not None:
+            return count_tokens_batch_with(tokenizer, texts)
+        
+        return [self.count_tokens(text) for text in texts]
+    
+    def _model_family(self) -> str:
+        """Get the current model's name without its tag, e.g. codellama"""
+        return self.model.lower().split(":", 1)[0]
+    
+    def _get_tokenizer(self):
+        """
+        Get the configured tokenizer if it matches the current model's family
+        
+        Checked on every call since app.py can switch self.model.
+        
+        Returns:
+            tokenizers.Tokenizer, or None to fall back to the estimate
+        """
+        if self._tokenizer is not None and self._model_family() == self._tokenizer_family:
+            return self._tokenizer
+        return None
+    
     async def get_model_info(self) -> Dict[str, Any]:
         """
         Get information about the model
@@ -180,33 +361,32 @@ class OllamaProvider(BaseModelProvider):
             Dictionary with model information
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.api_url}/api/tags") as response:
-                    if response.status != 200:
-                        return {"error": f"Failed to get model info: {response.status}"}
-                    
-                    result = await response.json()
-                    
-                    # Find the specific model in the list
-                    model_info = None
-                    for model in result.get("models", []):
-                        if model.get("name") == self.model:
-                            model_info = model
-                            break
-                    
-                    if model_info:
-                        return {
-                            "name": model_info.get("name"),
-                            "size": model_info.get("size"),
-                            "modified_at": model_info.get("modified_at"),
-                            "server_id": self.server_id,
-                            "api_url": self.api_url
-                        }
-                    else:
-                        return {"error": f"Model {self.model} not found on server {self.server_id}"}
+            response = await get_shared_client().get(f"{self.api_url}/api/tags", timeout=request_timeout(_PROBE_TIMEOUT))
+            if response.status_code != 200:
+                return {"error": f"Failed to get model info: {response.status_code}"}
+            
+            result = decode_json(response.content)
+            
+            # Find the specific model in the list
+            model_info = None
+            for model in result.get("models", []):
+                if model.get("name") == self.model:
+                    model_info = model
+                    break
+            
+            if model_info:
+                return {
+                    "name": model_info.get("name"),
+                    "size": model_info.get("size"),
+                    "modified_at": model_info.get("modified_at"),
+                    "server_id": self.server_id,
+                    "api_url": self.api_url
+                }
+            else:
+                return {"error": f"Model {self.model} not found on server {self.server_id}"}
         
         except Exception as e:
-            logger.error(f"Error getting model info: {e}")
+            logger.error("Error getting model info: %s", e)
             return {"error": str(e)}
     
     async def check_availability(self) -> Dict[str, Any]:
@@ -217,31 +397,30 @@ class OllamaProvider(BaseModelProvider):
             Dictionary with availability status
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(f"{self.api_url}/api/tags") as response:
-                    if response.status != 200:
-                        return {
-                            "available": False,
-                            "reason": f"Server returned status {response.status}"
-                        }
-                    
-                    result = await response.json()
-                    models = [model.get("name") for model in result.get("models", [])]
-                    
-                    if self.model in models:
-                        return {
-                            "available": True,
-                            "server_id": self.server_id
-                        }
-                    else:
-                        return {
-                            "available": False,
-                            "reason": f"Model {self.model} not found on server {self.server_id}",
-                            "available_models": models
-                        }
+            response = await get_shared_client().get(f"{self.api_url}/api/tags", timeout=request_timeout(_PROBE_TIMEOUT))
+            if response.status_code != 200:
+                return {
+                    "available": False,
+                    "reason": f"Server returned status {response.status_code}"
+                }
+            
+            result = decode_json(response.content)
+            models = [model.get("name") for model in result.get("models", [])]
+            
+            if self.model in models:
+                return {
+                    "available": True,
+                    "server_id": self.server_id
+                }
+            else:
+                return {
+                    "available": False,
+                    "reason": f"Model {self.model} not found on server {self.server_id}",
+                    "available_models": models
+                }
         
         except Exception as e:
-            logger.error(f"Error checking model availability: {e}")
+            logger.error("Error checking model availability: %s", e)
             return {
                 "available": False,
                 "reason": str(e)
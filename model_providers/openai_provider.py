@@ -5,13 +5,73 @@ Implementation for OpenAI's GPT models
 
 import os
 import re
+import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+import weakref
+import functools
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, AsyncIterator
 
-import openai
-from openai import OpenAI
+from model_providers.base_provider import BaseModelProvider, PromptTooLongError
+from model_providers.circuit_breaker import get_breaker
+from model_providers._http import get_shared_client, request_timeout
 
-from model_providers.base_provider import BaseModelProvider
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _openai():
+    """Import the OpenAI SDK on first use, so importing this module stays cheap"""
+    import openai
+    return openai
+
+
+@functools.lru_cache(maxsize=None)
+def _encoding_for_model(model: str):
+    """
+    Load the tiktoken encoding for a model once, shared by all providers using it
+    
+    Args:
+        model: GPT model name
+        
+    Returns:
+        tiktoken Encoding, or None if tiktoken is not installed
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        # Models tiktoken doesn't know yet
+        return tiktoken.get_encoding("cl100k_base")
+
+
+# Code blocks with or without language specification
+_CODE_FENCE_RE = re.compile(r'```(?:\w+\n)?(.*?)```', re.DOTALL)
+
+# Generation can take much longer than the shared client's default timeout
+_REQUEST_TIMEOUT = 600.0
+
+# Retries the SDK makes on connection errors, 429s and 5xx responses
+_MAX_RETRIES = 2
+
+# A line that, once stripped, starts with a definition or import keyword,
+# suggesting an unfenced response is code
+_CODE_HINT_RE = re.compile(r'^[^\S\n]*(?:def|class|import|from) [^\n]*\S', re.MULTILINE)
+
+# Context window sizes for different GPT models
+_CONTEXT_WINDOWS = MappingProxyType({
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-16k": 16385,
+    # Add more models as they become available
+})
 
 
 class OpenAIProvider(BaseModelProvider):
@@ -32,7 +92,73 @@ class OpenAIProvider(BaseModelProvider):
             raise ValueError("OpenAI API key is required")
         
         self.model = model
-        self.client = OpenAI(api_key=self.api_key)
+        
+        # Async clients use the shared HTTP client of the event loop they were
+        # created on, so keep one per loop (app.py runs a loop per worker
+        # thread while providers are shared)
+        self._async_clients = weakref.WeakKeyDictionary()
+    
+    def _get_async_client(self) -> "openai.AsyncOpenAI":
+        """
+        Get the async client for the running event loop, creating it on first use
+        
+        Returns:
+            AsyncOpenAI client bound to the current event loop
+        """
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None or client.is_closed():
+            client = _openai().AsyncOpenAI(
+                api_key=self.api_key,
+                http_client=get_shared_client(),
+                max_retries=_MAX_RETRIES,
+                timeout=request_timeout(_REQUEST_TIMEOUT)
+            )
+            self._async_clients[loop] = client
+        return client
+    
+    async def close(self) -> None:
+        """
+        Drop the async client for the running event loop
+        
+        Its connections belong to the shared HTTP client, which is closed with
+        model_providers._http.close_shared_client().
+        """
+        self._async_clients.pop(asyncio.get_running_loop(), None)
+    
+    def _build_params(self,
+                      prompt: str,
+                      system_prompt: Optional[str],
+                      temperature: float,
+                      max_tokens: int) -> Dict[str, Any]:
+        """
+        Build the chat completions parameters for a single prompt
+        
+        Args:
+            prompt: The user prompt to send to GPT
+            system_prompt: System instructions for GPT (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Returns:
+            Dictionary of request parameters
+        """
+        messages = []
+        
+        # Add system message if provided
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+            
+        # Add user message
+        messages.append({"role": "user", "content": prompt})
+        
+        # Use the appropriate parameters for GPT
+        return {
+            "model": self.model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
         
     async def generate_response(self, 
                                prompt: str, 
@@ -51,38 +177,73 @@ class OpenAIProvider(BaseModelProvider):
         Returns:
             String containing GPT's response
         """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return ""
+        
         try:
-            messages = []
+            max_tokens = self._bound_max_tokens(prompt, system_prompt, max_tokens)
+            params = self._build_params(prompt, system_prompt, temperature, max_tokens)
             
-            # Add system message if provided
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-                
-            # Add user message
-            messages.append({"role": "user", "content": prompt})
-            
-            # Use the appropriate parameters for GPT
-            params = {
-                "model": self.model,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature
-            }
-            
-            # Run in an asyncio event loop
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(
-                None,
-                lambda: self.client.chat.completions.create(**params)
-            )
+            # Native async request, no executor thread hand-off
+            response = await self._get_async_client().chat.completions.create(**params)
             
+            get_breaker("openai").record_success()
             return response.choices[0].message.content
             
+        except PromptTooLongError as e:
+            # Rejected before sending, so not a provider failure
+            logger.error("Error generating response from GPT: %s", e)
+            return f"Error: {str(e)}"
+            
         except Exception as e:
-            print(f"Error generating response from GPT: {e}")
+            get_breaker("openai").record_failure()
+            logger.error("Error generating response from GPT: %s", e)
             return f"Error: {str(e)}"
     
-    async def extract_code(self, response: str) -> List[str]:
+    async def stream_response(self,
+                              prompt: str,
+                              system_prompt: Optional[str] = None,
+                              temperature: float = 0.7,
+                              max_tokens: int = 4000) -> AsyncIterator[str]:
+        """
+        Generate a response from GPT, yielding text as it arrives
+        
+        Args:
+            prompt: The user prompt to send to GPT
+            system_prompt: System instructions for GPT (optional)
+            temperature: Controls randomness, higher values = more random
+            max_tokens: Maximum number of tokens to generate
+            
+        Yields:
+            Chunks of GPT's response text
+        """
+        # Nothing to send for an empty prompt
+        if not prompt or prompt.isspace():
+            return
+        
+        try:
+            max_tokens = self._bound_max_tokens(prompt, system_prompt, max_tokens)
+            params = self._build_params(prompt, system_prompt, temperature, max_tokens)
+            
+            stream = await self._get_async_client().chat.completions.create(stream=True, **params)
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+            
+            get_breaker("openai").record_success()
+            
+        except PromptTooLongError as e:
+            # Rejected before sending, so not a provider failure
+            logger.error("Error streaming response from GPT: %s", e)
+            yield f"Error: {str(e)}"
+            
+        except Exception as e:
+            get_breaker("openai").record_failure()
+            logger.error("Error streaming response from GPT: %s", e)
+            yield f"Error: {str(e)}"
+    
+    def extract_code(self, response: str) -> List[str]:
         """
         Extract code blocks from GPT's response
         
@@ -92,15 +253,13 @@ class OpenAIProvider(BaseModelProvider):
         Returns:
             List of extracted code blocks
         """
-        # Pattern to match code blocks with or without language specification
-        pattern = r'```(?:\w+\n)?(.*?)```'
-        matches = re.findall(pattern, response, re.DOTALL)
+        # Skip the regex entirely when there is no code fence
+        matches = _CODE_FENCE_RE.findall(response) if '```' in response else []
         
         # If no matches found, check if the entire response might be code
         if not matches and not response.startswith('```') and not response.endswith('```'):
             # Heuristic: If response has multiple lines and looks like code
-            lines = response.split('\n')
-            if len(lines) > 1 and any(line.strip().startswith(('def ', 'class ', 'import ', 'from ')) for line in lines):
+            if '\n' in response and _CODE_HINT_RE.search(response):
                 return [response]
         
         return matches
@@ -120,18 +279,7 @@ class OpenAIProvider(BaseModelProvider):
         Returns:
             Integer representing the context window size
         """
-        # Context window sizes for different GPT models
-        context_windows = {
-            "gpt-4o": 128000,
-            "gpt-4-turbo": 128000,
-            "gpt-4": 8192,
-            "gpt-4-32k": 32768,
-            "gpt-3.5-turbo": 16385,
-            "gpt-3.5-turbo-16k": 16385,
-            # Add more models as they become available
-        }
-        
-        return context_windows.get(self.model, 8192)  # Default to 8K
+        return _CONTEXT_WINDOWS.get(self.model, 8192)  # Default to 8K
     
     def count_tokens(self, text: str) -> int:
         """
@@ -145,14 +293,18 @@ class OpenAIProvider(BaseModelProvider):
         """
         try:
             # Use tiktoken if available (not imported by default to reduce dependencies)
-            try:
-                import tiktoken
-                encoding = tiktoken.encoding_for_model(self.model)
+            encoding = _encoding_for_model(self.model)
+            if encoding is not None:
                 return len(encoding.encode(text))
-            except ImportError:
-                # Fallback to rough estimate
-                return len(text.split()) * 1.3  # Rough estimate
+            
+            # Fallback to rough estimate
+            return int(len(text.split()) * 1.3)  # Rough estimate
         except Exception as e:
-            print(f"Error counting tokens: {e}")
+            logger.error("Error counting tokens: %s", e)
             # Fallback to rough estimate
-            return len(text.split()) * 1.3  # Rough estimate
+            return int(len(text.split()) * 1.3)  # Rough estimate
+    
+    @staticmethod
+    def clear_encoding_cache() -> None:
+        """Drop the cached tiktoken encodings, e.g. between tests in a long-running process"""
+        _encoding_for_model.cache_clear()
@@ -0,0 +1,97 @@
+"""
+Rate Limiter
+Token-bucket rate limiting for concurrent provider requests
+"""
+
+import time
+import asyncio
+import threading
+from contextlib import asynccontextmanager
+from typing import Optional
+
+
+class _TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate
+    
+    Capacity is reserved up front and the bucket may go negative; the deficit
+    is how long the caller has to wait, so concurrent callers queue up in the
+    order they reserved.
+    """
+    
+    def __init__(self, per_minute: float):
+        """
+        Initialize the bucket full
+        
+        Args:
+            per_minute: Capacity of the bucket and amount refilled per minute
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def reserve(self, amount: float) -> float:
+        """
+        Take capacity from the bucket
+        
+        Args:
+            amount: Capacity to take; clamped to the bucket size so a single
+                oversized request can't wait forever
+        
+        Returns:
+            Seconds to wait before the reserved capacity is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+            self.updated = now
+            
+            self.level -= min(amount, self.capacity)
+            return 0.0 if self.level >= 0 else -self.level / self.rate
+
+
+class AsyncRateLimiter:
+    """
+    Limits requests per minute and tokens per minute across concurrent callers
+    
+    Waiting is done with asyncio.sleep and the bookkeeping is guarded by a
+    thread lock, so one limiter can be shared by providers used from several
+    event loops.
+    """
+    
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Initialize the rate limiter
+        
+        Args:
+            requests_per_minute: Maximum requests per minute, None for no limit
+            tokens_per_minute: Maximum tokens per minute, None for no limit
+        """
+        self._requests = _TokenBucket(requests_per_minute) if requests_per_minute else None
+        self._tokens = _TokenBucket(tokens_per_minute) if tokens_per_minute else None
+    
+    @property
+    def limits_tokens(self) -> bool:
+        """Whether acquire() needs a token cost to enforce a tokens-per-minute limit"""
+        return self._tokens is not None
+    
+    @asynccontextmanager
+    async def acquire(self, cost: float = 0):
+        """
+        Wait until a request of the given token cost fits within the limits
+        
+        Args:
+            cost: Estimated tokens consumed by the request (prompt + completion)
+        """
+        delay = 0.0
+        if self._requests is not None:
+            delay = self._requests.reserve(1)
+        if self._tokens is not None and cost:
+            delay = max(delay, self._tokens.reserve(cost))
+        
+        if delay > 0:
+            await asyncio.sleep(delay)
+        
+        yield
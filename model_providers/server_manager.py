@@ -5,11 +5,50 @@ This module manages server configurations for local model providers
 
 import os
 import json
+import hashlib
 import logging
-from typing import Dict, Any, List, Optional
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+def _read_json(path: str) -> Any:
+    """
+    Read a JSON file, with orjson when it is installed
+    
+    Args:
+        path: Path to the JSON file
+        
+    Returns:
+        The decoded value
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def _write_json(path: str, data: Any) -> None:
+    """
+    Write a JSON file indented by two spaces, with orjson when it is installed
+    
+    Args:
+        path: Path to the JSON file
+        data: JSON-serializable value
+    """
+    if orjson is not None:
+        content = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+    else:
+        content = json.dumps(data, indent=2).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(content)
+
 class ServerManager:
     """
     Manages server configurations for local model providers.
@@ -25,6 +64,19 @@ class ServerManager:
         """
         self.config_path = config_path or os.path.join('config', 'server_config.json')
         self.servers: Dict[str, Dict[str, Any]] = {}
+        
+        # Flask serves requests from several threads, so updates to the
+        # servers and the config file written from them are serialized
+        self._lock = threading.Lock()
+        
+        # Copy of servers handed out by get_all_servers, rebuilt after changes
+        self._servers_snapshot: Optional[Dict[str, Dict[str, Any]]] = None
+        
+        # Digest of the servers as last loaded or saved, and the file's
+        # (mtime_ns, size) at that point, to skip no-op saves
+        self._saved_digest: Optional[bytes] = None
+        self._saved_version: Optional[Tuple[int, int]] = None
+        
         self._load_config()
     
     def _load_config(self) -> None:
@@ -48,18 +100,46 @@ class ServerManager:
                 }
             }
             
-            with open(self.config_path, 'w') as f:
-                json.dump(initial_config, f, indent=2)
+            _write_json(self.config_path, initial_config)
             
             self.servers = {}
         else:
             try:
-                with open(self.config_path, 'r') as f:
-                    config = json.load(f)
+                config = _read_json(self.config_path)
                 self.servers = config.get('servers', {})
             except (json.JSONDecodeError, IOError) as e:
                 logger.error(f"Error loading server config: {e}")
                 self.servers = {}
+                return
+        
+        self._saved_digest = self._servers_digest()
+        self._saved_version = self._config_version()
+    
+    def _config_version(self) -> Optional[Tuple[int, int]]:
+        """
+        Get the config file's modification time and size
+        
+        Returns:
+            tuple: (mtime_ns, size), or None if the file does not exist
+        """
+        try:
+            stat = os.stat(self.config_path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    
+    def _servers_digest(self) -> bytes:
+        """
+        Hash the servers section, independent of key order
+        
+        Returns:
+            bytes: 16-byte digest of the serialized servers
+        """
+        if orjson is not None:
+            payload = orjson.dumps(self.servers, option=orjson.OPT_SORT_KEYS)
+        else:
+            payload = json.dumps(self.servers, sort_keys=True).encode('utf-8')
+        return hashlib.blake2b(payload, digest_size=16).digest()
     
     def _save_config(self) -> bool:
         """
@@ -69,19 +149,40 @@ class ServerManager:
             bool: True if successful, False otherwise
         """
         try:
+            # Nothing to write when the servers match what's on disk, e.g. a
+            # server updated with its current settings, unless the file was
+            # changed or removed by someone else since
+            digest = self._servers_digest()
+            if (digest == self._saved_digest and self._saved_version is not None
+                    and self._config_version() == self._saved_version):
+                return True
+            
             # Load current config to preserve other settings
             current_config = {}
             if os.path.exists(self.config_path):
-                with open(self.config_path, 'r') as f:
-                    current_config = json.load(f)
+                current_config = _read_json(self.config_path)
             
             # Update servers section
             current_config['servers'] = self.servers
             
-            # Save the updated config
-            with open(self.config_path, 'w') as f:
-                json.dump(current_config, f, indent=2)
+            # Save the updated config, replacing the file in one step so a
+            # crash mid-write can't leave it truncated. The temp file is unique
+            # to this save, as other worker processes may be saving too.
+            fd, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(self.config_path) or '.', suffix='.tmp'
+            )
+            os.close(fd)
+            try:
+                # mkstemp creates the file owner-only; keep the usual permissions
+                os.chmod(temp_path, 0o644)
+                _write_json(temp_path, current_config)
+                os.replace(temp_path, self.config_path)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
             
+            self._saved_digest = digest
+            self._saved_version = self._config_version()
             return True
         except (IOError, json.JSONDecodeError) as e:
             logger.error(f"Error saving server config: {e}")
@@ -91,10 +192,18 @@ class ServerManager:
         """
         Get all configured servers
         
+        The returned dictionary is shared between callers until the servers
+        change and must be treated as read-only.
+        
         Returns:
             dict: Dictionary of server configurations
         """
-        return self.servers
+        # Copy, so callers can iterate it while another request adds a server
+        snapshot = self._servers_snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._servers_snapshot = dict(self.servers)
+        return snapshot
     
     def get_server(self, server_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -127,11 +236,13 @@ class ServerManager:
                     logger.error(f"Missing required field: {field}")
                     return False
             
-            # Add or update server
-            self.servers[server_id] = config
-            
-            # Save config
-            return self._save_config()
+            with self._lock:
+                # Add or update server
+                self.servers[server_id] = config
+                self._servers_snapshot = None
+                
+                # Save config
+                return self._save_config()
         except Exception as e:
             logger.error(f"Error adding server: {e}")
             return False
@@ -146,16 +257,18 @@ class ServerManager:
         Returns:
             bool: True if successful, False otherwise
         """
-        if server_id not in self.servers:
-            logger.error(f"Server not found: {server_id}")
-            return False
-        
         try:
-            # Remove server
-            del self.servers[server_id]
-            
-            # Save config
-            return self._save_config()
+            with self._lock:
+                if server_id not in self.servers:
+                    logger.error(f"Server not found: {server_id}")
+                    return False
+                
+                # Remove server
+                del self.servers[server_id]
+                self._servers_snapshot = None
+                
+                # Save config
+                return self._save_config()
         except Exception as e:
             logger.error(f"Error removing server: {e}")
             return False
@@ -191,6 +304,7 @@ class ServerManager:
 
 # Helper function to get server manager instance
 _server_manager_instance = None
+_server_manager_lock = threading.Lock()
 
 def get_server_manager(config_path: str = None) -> ServerManager:
     """
@@ -205,6 +319,9 @@ def get_server_manager(config_path: str = None) -> ServerManager:
     global _server_manager_instance
     
     if _server_manager_instance is None:
-        _server_manager_instance = ServerManager(config_path)
+        # Concurrent first requests must not each load their own instance
+        with _server_manager_lock:
+            if _server_manager_instance is None:
+                _server_manager_instance = ServerManager(config_path)
     
     return _server_manager_instance
\ No newline at end of file
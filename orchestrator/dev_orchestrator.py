@@ -344,10 +344,10 @@ class ScriptGenerator:
             )
             
             # Extract code from the response
-            code_blocks = await self.provider.extract_code(response)
+            code_block = self.provider.extract_first_code_block(response)
             
-            if code_blocks:
-                return code_blocks[0]  # Return the first code block
+            if code_block is not None:
+                return code_block  # Return the first code block
             else:
                 # If no code blocks found, return the full response
                 return response
@@ -366,7 +366,7 @@ install_dependencies() {
     fi
     
     print_message "Installing main dependencies..."
-    local main_deps="flask flask-login anthropic>=0.5.0 tqdm>=4.65.0 python-dotenv aiohttp openai"
+    local main_deps="flask flask-login anthropic>=0.5.0 tqdm>=4.65.0 python-dotenv httpx h2 openai"
     print_status "Dependencies to install: $main_deps"
     if pip3 install $main_deps > /tmp/main-deps-install.log 2>&1; then
         print_success "Main dependencies installed"
@@ -104,10 +104,10 @@ class ComponentGenerator:
             )
             
             # Extract code from the response
-            code_blocks = await self.provider.extract_code(response)
+            code_block = self.provider.extract_first_code_block(response)
             
-            if code_blocks:
-                script_content = code_blocks[0]  # Use the first code block
+            if code_block is not None:
+                script_content = code_block  # Use the first code block
             else:
                 # If no code blocks found, use the full response
                 script_content = response